@@ -0,0 +1,67 @@
+"""Compare the compile time of contracts/NFT.py with the remote and the
+vendored FA2 library.
+
+The remote variant compiles a temporary copy of NFT.py that imports the
+upstream template instead of the pinned library.
+
+Usage: python compilation/bench_compile.py [runs]
+"""
+
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SMARTPY = shutil.which("smartpy.sh") or os.path.expanduser("~/smartpy-cli/SmartPy.sh")
+
+NFT_SOURCE = "contracts/NFT.py"
+
+VENDORED_IMPORT = "FA2 = import_fa2()\n"
+
+REMOTE_IMPORT = (
+    'FA2 = sp.io.import_script_from_url('
+    '"https://smartpy.io/templates/fa2_lib.py", name="templates/fa2_lib.py")\n'
+)
+
+
+def remote_source(output):
+    """Write a copy of NFT.py importing the remote template, return its path."""
+    with open(NFT_SOURCE) as f:
+        source = f.read()
+    # Without the import line the copy would time the local fork again
+    if VENDORED_IMPORT not in source:
+        raise Exception("%s has no %r line to replace" % (NFT_SOURCE, VENDORED_IMPORT))
+    path = os.path.join(output, "NFT_remote.py")
+    with open(path, "w") as f:
+        f.write(source.replace(VENDORED_IMPORT, REMOTE_IMPORT, 1))
+    return path
+
+
+def compile_time(source):
+    """Return the wall time in seconds of one compilation of `source`."""
+    with tempfile.TemporaryDirectory() as output:
+        start = time.perf_counter()
+        subprocess.run(
+            [SMARTPY, "compile", source, output],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        return time.perf_counter() - start
+
+
+def main(runs=5):
+    with tempfile.TemporaryDirectory() as sources:
+        variants = {"remote": remote_source(sources), "vendored": NFT_SOURCE}
+        for name, source in variants.items():
+            times = [compile_time(source) for _ in range(runs)]
+            print(
+                "%-8s median %.2fs  min %.2fs  max %.2fs"
+                % (name, statistics.median(times), min(times), max(times))
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -1,20 +1,9 @@
 import smartpy as sp
 
-t_ticket_item_state = sp.TVariant(
-    created = sp.TAddress,
-    sold = sp.TAddress,
-    inactive = sp.TAddress,
-)
+market = sp.io.import_script_from_url("file:contracts/ticket_market.py")
 
-t_ticket_item = sp.TRecord(
-    id = sp.TNat,
-    address = sp.TAddress,
-    token_id = sp.TNat,
-    seller = sp.TAddress,
-    buyer = sp.TAddress,
-    price = sp.TMutez,
-    state = t_ticket_item_state
-)
+TicketItemState = market.TicketItemState
+t_ticket_item = market.t_event_ticket_item
 
 t_transfer_batch = sp.TRecord(
     from_=sp.TAddress,
@@ -29,11 +18,41 @@ t_transfer_batch = sp.TRecord(
 
 t_transfer_params = sp.TList(t_transfer_batch)
 
-class Event(sp.Contract):
+t_burn_params = sp.TList(
+    sp.TRecord(from_=sp.TAddress, token_id=sp.TNat, amount=sp.TNat).layout(
+        ("from_", ("token_id", "amount"))
+    )
+)
+
+t_balance_of_request = sp.TRecord(owner=sp.TAddress, token_id=sp.TNat).layout(
+    ("owner", "token_id")
+)
+
+t_balance_of_response = sp.TRecord(
+    request=t_balance_of_request, balance=sp.TNat
+).layout(("request", "balance"))
+
+t_mint_item = sp.TRecord(to_=sp.TAddress, metadata=sp.TMap(sp.TString, sp.TBytes))
+
+t_mint_batch = sp.TList(t_mint_item)
+
+# tickets of a class are minted on demand, only the sold counter is stored,
+# reserved counts the tickets offered to the waitlist and not bought yet
+t_ticket_class = sp.TRecord(
+    price = sp.TMutez,
+    supply = sp.TNat,
+    sold = sp.TNat,
+    reserved = sp.TNat,
+    sale_start = sp.TTimestamp,
+    sale_end = sp.TTimestamp,
+    metadata = sp.TMap(sp.TString, sp.TBytes)
+)
+
+class Event(market.TicketMarket, sp.Contract):
     """A class Event contracts for FatCowIO Trading Protocol .
     """
  
-    def __init__(self, administrator,creator, metadata, nftfa2,tick_amount,tick_fee,commission, threshold, royalty, revenue, timeend,shareaddress):
+    def __init__(self, administrator,creator, metadata, nftfa2,tick_amount,tick_fee,commission, threshold, royalty, revenue, timeend,shareaddress, offer_duration=86400):
         """Initializes the contracts.
         """
         # Initialize the contracts storage
@@ -53,14 +72,53 @@ class Event(sp.Contract):
             timestart=sp.timestamp_from_utc_now(),
             timeend=sp.timestamp_from_utc_now().add_seconds(timeend),
             ticket_paused=False,
+            collected_fees=sp.mutez(0),
             item_id = sp.nat(1),
             ticket_items=sp.big_map(
                 tkey=sp.TNat,
                 tvalue=t_ticket_item,
             ),
+            # tickets of each user keyed by (user, index) with a per-user counter
             user_items=sp.big_map(
+                tkey=sp.TPair(sp.TAddress, sp.TNat),
+                tvalue=sp.TNat
+            ),
+            user_item_counts=sp.big_map(
                 tkey=sp.TAddress,
-                tvalue=sp.TSet(sp.TNat)
+                tvalue=sp.TNat
+            ),
+            class_id=sp.nat(0),
+            # sum of the ticket class supplies, bounded by tick_amount
+            class_supply=sp.nat(0),
+            ticket_classes=sp.big_map(
+                tkey=sp.TNat,
+                tvalue=t_ticket_class,
+            ),
+            # waitlist of each class keyed by (class_id, position), served from
+            # the head position, positions of the users who left are vacant
+            waitlist=sp.big_map(
+                tkey=sp.TPair(sp.TNat, sp.TNat),
+                tvalue=sp.TAddress,
+            ),
+            waitlist_bounds=sp.big_map(
+                tkey=sp.TNat,
+                tvalue=sp.TRecord(head=sp.TNat, tail=sp.TNat),
+            ),
+            waitlist_positions=sp.big_map(
+                tkey=sp.TPair(sp.TNat, sp.TAddress),
+                tvalue=sp.TNat,
+            ),
+            # deadline of the ticket offered to a user served from the
+            # waitlist of a class, an expired offer can be reclaimed
+            waitlist_offers=sp.big_map(
+                tkey=sp.TPair(sp.TNat, sp.TAddress),
+                tvalue=sp.TTimestamp,
+            ),
+            offer_duration=sp.int(offer_duration),
+            # ticket class of each ticket item sold by a class
+            class_tickets=sp.big_map(
+                tkey=sp.TNat,
+                tvalue=sp.TNat,
             ),
             shareaddress=shareaddress
             
@@ -89,6 +147,104 @@ class Event(sp.Contract):
         """
         sp.verify(sp.amount == sp.tez(0), message="MP_TEZ_TRANSFER")
 
+    def check_is_token_owner(self, fa2, token_id):
+        """Checks that the address that called the entry point is the event
+        creator or owns the token, calling the FA2 contracts on-chain view.
+        """
+        with sp.if_(sp.sender != self.data.creator):
+            balances = sp.view(
+                name="get_balance_of",
+                address=fa2,
+                param=sp.list([sp.record(owner=sp.sender, token_id=token_id)]),
+                t=sp.TList(t_balance_of_response)).open_some("MP_NO_BALANCE_VIEW")
+            with sp.for_("response", balances) as response:
+                sp.verify(response.balance > 0, message="MP_NOT_TOKEN_OWNER")
+
+    def add_user_item(self, owner, item_id):
+        """Appends a ticket item id to the tickets of the owner, in constant
+        cost whatever the number of tickets the owner holds.
+        """
+        count = sp.compute(self.data.user_item_counts.get(owner, sp.nat(0)))
+        self.data.user_items[sp.pair(owner, count)] = item_id
+        self.data.user_item_counts[owner] = count + 1
+
+    def next_token_id(self):
+        """Returns the id of the next token minted by the event FA2, calling
+        the FA2 contracts on-chain view.
+        """
+        return sp.view(
+            name="get_next_token_id",
+            address=self.data.fa2,
+            param=sp.unit,
+            t=sp.TNat).open_some("MP_NO_TOKEN_ID_VIEW")
+
+    def add_class_ticket(self, class_id, token_id, price):
+        """Records a minted class ticket as a ticket item sold to the sender
+        and appends it to the tickets of the sender.
+        """
+        item_id = sp.compute(self.data.item_id)
+        self.data.class_tickets[item_id] = class_id
+        self.data.ticket_items[item_id] = sp.record(
+            id=item_id,
+            fa2=sp.none,
+            token_id=token_id,
+            seller=sp.self_address,
+            buyer=sp.some(sp.sender),
+            price=price,
+            state=TicketItemState.SOLD.value
+        )
+        self.add_user_item(sp.sender, item_id)
+        self.data.item_id += 1
+
+    def take_class_tickets(self, class_id, quantity):
+        """Checks that a number of tickets of a class are on sale and counts
+        them as sold, returns the ticket class.
+
+        A ticket offered to the sender from the waitlist is used first.
+        """
+        sp.verify(self.data.ticket_classes.contains(class_id), "MP_WRONG_CLASS_ID")
+        ticket_class = self.data.ticket_classes[class_id]
+        sp.verify(sp.now >= ticket_class.sale_start, "MP_SALE_NOT_STARTED")
+        sp.verify(sp.now < ticket_class.sale_end, "MP_SALE_ENDED")
+        offer_key = sp.compute(sp.pair(class_id, sp.sender))
+        with sp.if_(self.data.waitlist_offers.contains(offer_key)):
+            del self.data.waitlist_offers[offer_key]
+            ticket_class.reserved = sp.as_nat(ticket_class.reserved - 1)
+        sp.verify(ticket_class.sold + ticket_class.reserved + quantity <= ticket_class.supply,
+                  "MP_SOLD_OUT")
+        ticket_class.sold += quantity
+        return ticket_class
+
+    def serve_waitlist_(self, class_id):
+        """Pops the head of the waitlist of a class and offers it a ticket if
+        one is available. A vacant head is skipped.
+        """
+        ticket_class = self.data.ticket_classes[class_id]
+        bounds = sp.compute(self.data.waitlist_bounds.get(
+            class_id, sp.record(head=sp.nat(0), tail=sp.nat(0))))
+        with sp.if_((bounds.head < bounds.tail) &
+                    (ticket_class.sold + ticket_class.reserved < ticket_class.supply)):
+            head_key = sp.compute(sp.pair(class_id, bounds.head))
+            with sp.if_(self.data.waitlist.contains(head_key)):
+                user = sp.compute(self.data.waitlist[head_key])
+                del self.data.waitlist[head_key]
+                del self.data.waitlist_positions[sp.pair(class_id, user)]
+                self.data.waitlist_offers[sp.pair(class_id, user)] = sp.now.add_seconds(
+                    self.data.offer_duration)
+                ticket_class.reserved += 1
+            self.data.waitlist_bounds[class_id] = sp.record(head=bounds.head + 1, tail=bounds.tail)
+
+    def reclaim_offer_(self, class_id, user):
+        """Frees the ticket of an expired waitlist offer.
+        """
+        offer_key = sp.compute(sp.pair(class_id, user))
+        deadline = sp.compute(self.data.waitlist_offers.get_opt(
+            offer_key).open_some("MP_NO_OFFER"))
+        sp.verify(sp.now >= deadline, "MP_OFFER_NOT_EXPIRED")
+        del self.data.waitlist_offers[offer_key]
+        ticket_class = self.data.ticket_classes[class_id]
+        ticket_class.reserved = sp.as_nat(ticket_class.reserved - 1)
+
         
  
     #accept tez in contract
@@ -98,26 +254,36 @@ class Event(sp.Contract):
     
     @sp.entry_point
     def checkout_event(self, amount):
+        """Pays out an amount of the collected fees: the revenue share to the
+        administrator, the commission to the commission recipient and the
+        rest to the creator.
+        """
         self.check_is_administrator()
         self.check_is_proposed_administrator()
         sp.set_type(amount, sp.TMutez)
-        sp.verify(sp.balance >= amount, "Not Enough Withdraw Balance!")
+        sp.verify(self.data.collected_fees >= amount, "Not Enough Withdraw Balance!")
+        sp.verify(self.data.revenue + self.data.commission <= 1000, "MP_WRONG_SHARES")
 
-        #checkout to-do 
-        #compute share contributors revenue 
+        #compute share contributors revenue
         contributors_fee_amount = sp.local(
-                "contributors_fee_amount", sp.split_tokens(sp.balance, self.data.revenue, 1000))
+                "contributors_fee_amount", sp.split_tokens(amount, self.data.revenue, 1000))
 
-        #compute commission fee 
+        #compute commission fee
         commission_fee_amount = sp.local(
-                "fatcow_commission_amount", sp.split_tokens(sp.balance, self.data.commission, 1000))
+                "fatcow_commission_amount", sp.split_tokens(amount, self.data.commission, 1000))
+
+        self.data.collected_fees -= amount
 
-        #send to contributors 
+        #send to contributors
         sp.send(self.data.administrator, contributors_fee_amount.value)
 
         #send to commission
         sp.send(self.data.commission_recipient, commission_fee_amount.value)
 
+        #send the rest to the creator
+        sp.send(self.data.creator,
+                amount - contributors_fee_amount.value - commission_fee_amount.value)
+
  
     @sp.entry_point
     def create_ticket_item(self, params):
@@ -138,16 +304,21 @@ class Event(sp.Contract):
             ).layout(("contract_address", ("token_id", "price")))
         )
 
-        # current FA2 contracts has no on-chain view
+        # Check that the seller owns the token or is the event creator
+        self.check_is_token_owner(params.contract_address, params.token_id)
+
+        # Check that the price pays the ticket fee
+        sp.verify(params.price >= self.data.tick_fee, "MP_PRICE_BELOW_FEE")
+
         item_id = self.data.item_id
         item = sp.record(
             id=item_id,
-            address=params.contract_address,
+            fa2=self.fa2_override(params.contract_address),
             token_id=params.token_id,
             seller=sp.sender,
-            buyer=sp.sender,
+            buyer=sp.none,
             price=params.price,
-            state=sp.variant("created", sp.sender)
+            state=TicketItemState.CREATED.value
         )
 
         # add ticket to contract
@@ -156,6 +327,45 @@ class Event(sp.Contract):
         
         
         
+    @sp.entry_point
+    def create_ticket_class(self, params):
+        """Creates a ticket class, its tickets are minted when they are bought.
+
+        The supplies of all the classes can't exceed `tick_amount`.
+        """
+        sp.set_type(
+            params,
+            sp.TRecord(
+                price=sp.TMutez,
+                supply=sp.TNat,
+                sale_start=sp.TTimestamp,
+                sale_end=sp.TTimestamp,
+                metadata=sp.TMap(sp.TString, sp.TBytes)
+            ).layout(("price", ("supply", ("sale_start", ("sale_end", "metadata")))))
+        )
+
+        # Check that the creator executed the entry point
+        self.check_is_creator()
+
+        # Check that no tez have been transferred
+        self.check_no_tez_transfer()
+
+        sp.verify(params.sale_start < params.sale_end, "MP_WRONG_SALE_WINDOW")
+        sp.verify(self.data.class_supply + params.supply <= self.data.tick_amount,
+                  "MP_TICK_AMOUNT_EXCEEDED")
+
+        self.data.ticket_classes[self.data.class_id] = sp.record(
+            price=params.price,
+            supply=params.supply,
+            sold=sp.nat(0),
+            reserved=sp.nat(0),
+            sale_start=params.sale_start,
+            sale_end=params.sale_end,
+            metadata=params.metadata
+        )
+        self.data.class_supply += params.supply
+        self.data.class_id += 1
+
     @sp.entry_point
     def delete_ticket_item(self, params):
         """
@@ -165,8 +375,9 @@ class Event(sp.Contract):
         sp.verify(params < self.data.item_id, "id must < current id")
         sp.verify(self.data.ticket_items.contains(params), "item is not exists")
         item = self.data.ticket_items[params]
-        with sp.if_(item.state.is_variant("created")):
-            item.state = sp.variant("inactive", sp.sender)
+        sp.verify(sp.sender == item.seller, "only the seller can delete an item")
+        with sp.if_(item.state == TicketItemState.CREATED.value):
+            item.state = TicketItemState.INACTIVE.value
 
  
     @sp.entry_point
@@ -190,18 +401,12 @@ class Event(sp.Contract):
         """The proposed administrator accepts the contracts administrator
         responsabilities.
         """
-        # Check that there is a proposed administrator
-        sp.verify(self.data.proposed_administrator.is_some(),message="MINTER_NO_NEW_ADMIN")
-
         # Check that the proposed administrator executed the entry point
-        sp.verify(sp.sender == self.data.proposed_administrator.open_some(),essage="MINTER_NOT_PROPOSED_ADMIN")
+        sp.verify(sp.sender == self.data.proposed_administrator, message="MINTER_NOT_PROPOSED_ADMIN")
 
         # Set the new administrator address
         self.data.administrator = sp.sender
 
-        # Reset the proposed administrator value
-        self.data.proposed_administrator = sp.none
-
     @sp.entry_point
     def set_pause_buy(self, pause):
         """Pause or not the collects.
@@ -218,15 +423,13 @@ class Event(sp.Contract):
         # Pause or unpause the collects
         self.data.ticket_paused = pause
 
-    @sp.onchain_view()
-    def get_administrator(self):
-        """Returns the Event administrator address.
-        """
-        sp.result(self.data.administrator)
-        
-
     @sp.entry_point
     def buy_ticket(self, params):
+        """Buys a ticket item at its price.
+
+        The seller is paid the price minus the ticket fee, the fee stays in
+        the contract balance and is accounted in `collected_fees`.
+        """
         sp.set_type(
             params,
             sp.TRecord(
@@ -234,93 +437,209 @@ class Event(sp.Contract):
             )
         )
 
+        # Check that the ticket sales are not paused
+        sp.verify(~self.data.ticket_paused, message="MP_TICKET_PAUSED")
+
         #verify ticket items exist
         sp.verify(self.data.ticket_items.contains(params.item_id), "Ticket item not exist!")
-        # item = self.data.ticket_items[params.item_id]
-        # #verify ticket price and amount
-        # sp.verify(item.price == sp.amount, "transaction token is not enough")
-        
-        sp.send(sp.self_address, self.data.tick_fee)
-        
-    # @sp.entry_point
-    # def buy_ticket(self, params):
-    #     sp.set_type(
-    #         params,
-    #         sp.TRecord(
-    #             item_id=sp.TNat,
-    #         )
-    #     )
-        
-        #sp.send(sp.sender, amount)
-        #sp.send(sp.self_address, self.data.tick_fee)
+        item = self.data.ticket_items[params.item_id]
+        sp.verify(item.state == TicketItemState.CREATED.value, "Ticket item not on sale!")
+
+        #verify ticket price and amount
+        sp.verify(item.price == sp.amount, "transaction token is not enough")
+
+        # account the ticket fee and pay the seller
+        self.data.collected_fees += self.data.tick_fee
+        sp.send(item.seller, sp.amount - self.data.tick_fee)
+
+        # transfer the ticket to the buyer
+        self.fa2_transfer(
+            fa2=self.ticket_item_fa2(item),
+            from_=item.seller,
+            to_=sp.sender,
+            token_id=item.token_id,
+            token_amount=1)
+
+        # add the item to user purchase list
+        self.add_user_item(sp.sender, params.item_id)
+        # update ticket buyer and state
+        item.buyer = sp.some(sp.sender)
+        item.state = TicketItemState.SOLD.value
 
-        # sp.verify(self.data.ticket_items.contains(params.item_id), "ticket item")
-        # item = self.data.ticket_items[params.item_id]
-        # sp.verify(item.price == sp.amount, "transaction token is not enough")
-        
-        # transfer = sp.contract(t_transfer_params, item.address, "transfer").open_some("address is not a FA2 contracts")
-
-        # # transfer amount
-        # sp.transfer(sp.list([
-        #     sp.record(
-        #         from_=item.seller,
-        #         txs=sp.list([
-        #             sp.record(
-        #                 to_=sp.sender,
-        #                 token_id=item.token_id,
-        #                 amount=sp.nat(1)
-        #             )
-        #         ])
-        #     )
-        # ], t=t_transfer_batch), sp.tez(0), transfer)
-        
-        # sp.send(sp.sender, sp.tez(10))
-        
-        # calculate the profit
-        #sp.send(item.seller, sp.amount)
-        
-        #to-do fee, threshold, royalty, revenue
-        #fee
-        #threshold
-        #royalty
-        #revenue
-        
-        # # add the item to user purchase list
-        # self.data.user_items[sp.sender].add(item.id)
-        # # update ticket buyer  
-        # item.buyer = sp.sender
-        # # update the item state
-        # # change status sold in ticket_items list  
-        # item.state = sp.variant("sold", sp.source)
-        
+    @sp.entry_point
+    def buy_ticket_class(self, class_id):
+        """Buys a ticket of a class at its price, the ticket is minted to the
+        buyer.
+        """
+        sp.set_type(class_id, sp.TNat)
 
-    # @sp.entry_point
-    # def checkout_event(self, params):
-        
-    #     sp.set_type(
-    #         params,
-    #         sp.TRecord(
-    #             share_address=sp.TAddress,
-    #         )
-    #     )
-     
-    #     #check admin role
-    #     self.check_is_administrator()
-    #     #to-do fee, threshold, royalty, revenue
-    #     #fee
-    #     #threshold
-    #     #royalty
-    #     #call share contract get all address value
-    #     c_share = sp.contract(sp.TInt, self.data.shareaddress, entry_point = "get_all_share").open_some()
-    #     sp.transfer(-42, sp.mutez(0), c_share)
-    #     #checkoput all revenue
-    #     #c_share_pause = sp.contract(sp.TInt, self.data.shareaddress, entry_point = "set_pause_checkout").open_some()
-        
-    #     #finish pause event and share 
-    #     #contract = sp.self_entry_point(entry_point = 'set_pause_buy')
-    #     #self.set_pause_buy(True)
-        
+        # Check that the ticket sales are not paused
+        sp.verify(~self.data.ticket_paused, message="MP_TICKET_PAUSED")
+
+        ticket_class = self.take_class_tickets(class_id, 1)
+
+        #verify ticket price and amount
+        sp.verify(ticket_class.price == sp.amount, "transaction token is not enough")
+
+        # the event sells the ticket, the price is collected for the checkout
+        self.data.collected_fees += sp.amount
+
+        # record the ticket, its token is minted right after this call
+        self.add_class_ticket(class_id, self.next_token_id(), ticket_class.price)
+
+        # mint the ticket to the buyer
+        self.fa2_mint(sp.list([sp.record(
+            to_=sp.sender,
+            metadata=ticket_class.metadata)]))
+
+    @sp.entry_point
+    def buy_tickets(self, params):
+        """Buys a quantity of tickets of several classes in one operation.
+
+        The total price is checked once against the transferred amount and
+        all the tickets are minted to the buyer with a single FA2 call.
+        """
+        sp.set_type(params, sp.TList(sp.TRecord(
+            class_id=sp.TNat,
+            quantity=sp.TNat).layout(("class_id", "quantity"))))
+
+        # Check that the ticket sales are not paused
+        sp.verify(~self.data.ticket_paused, message="MP_TICKET_PAUSED")
+
+        total_price = sp.local("total_price", sp.mutez(0))
+        total_quantity = sp.local("total_quantity", sp.nat(0))
+        batch = sp.local("batch", sp.list([], t=t_mint_item))
+        # the tokens are minted in batch order right after this call
+        token_id = sp.local("token_id", self.next_token_id())
+        with sp.for_("order", params) as order:
+            ticket_class = self.take_class_tickets(order.class_id, order.quantity)
+            total_price.value += sp.split_tokens(ticket_class.price, order.quantity, 1)
+            total_quantity.value += order.quantity
+            with sp.for_("index", sp.range(0, order.quantity)):
+                self.add_class_ticket(order.class_id, token_id.value, ticket_class.price)
+                token_id.value += 1
+                batch.value.push(sp.record(to_=sp.sender, metadata=ticket_class.metadata))
+
+        sp.verify(total_quantity.value > 0, "MP_NO_TICKETS")
+
+        #verify ticket price and amount
+        sp.verify(total_price.value == sp.amount, "transaction token is not enough")
+
+        # the event sells the tickets, the price is collected for the checkout
+        self.data.collected_fees += sp.amount
+
+        # mint the tickets to the buyer
+        self.fa2_mint(batch.value.rev())
+
+    @sp.entry_point
+    def join_waitlist(self, class_id):
+        """Joins the tail of the waitlist of a sold out ticket class.
+        """
+        sp.set_type(class_id, sp.TNat)
+
+        # Check that no tez have been transferred
+        self.check_no_tez_transfer()
+
+        sp.verify(self.data.ticket_classes.contains(class_id), "MP_WRONG_CLASS_ID")
+        ticket_class = self.data.ticket_classes[class_id]
+        sp.verify(ticket_class.sold + ticket_class.reserved >= ticket_class.supply,
+                  "MP_NOT_SOLD_OUT")
+
+        user_key = sp.compute(sp.pair(class_id, sp.sender))
+        sp.verify(~self.data.waitlist_positions.contains(user_key) &
+                  ~self.data.waitlist_offers.contains(user_key),
+                  "MP_ALREADY_IN_WAITLIST")
+
+        bounds = sp.compute(self.data.waitlist_bounds.get(
+            class_id, sp.record(head=sp.nat(0), tail=sp.nat(0))))
+        self.data.waitlist[sp.pair(class_id, bounds.tail)] = sp.sender
+        self.data.waitlist_positions[user_key] = bounds.tail
+        self.data.waitlist_bounds[class_id] = sp.record(head=bounds.head, tail=bounds.tail + 1)
+
+    @sp.entry_point
+    def leave_waitlist(self, class_id):
+        """Leaves the waitlist of a ticket class or declines the ticket it
+        offered, which is then offered to the next user of the waitlist.
+        """
+        sp.set_type(class_id, sp.TNat)
+
+        # Check that no tez have been transferred
+        self.check_no_tez_transfer()
+
+        user_key = sp.compute(sp.pair(class_id, sp.sender))
+        with sp.if_(self.data.waitlist_offers.contains(user_key)):
+            del self.data.waitlist_offers[user_key]
+            ticket_class = self.data.ticket_classes[class_id]
+            ticket_class.reserved = sp.as_nat(ticket_class.reserved - 1)
+            self.serve_waitlist_(class_id)
+        with sp.else_():
+            position = sp.compute(self.data.waitlist_positions.get_opt(
+                user_key).open_some("MP_NOT_IN_WAITLIST"))
+            del self.data.waitlist[sp.pair(class_id, position)]
+            del self.data.waitlist_positions[user_key]
+
+    @sp.entry_point
+    def serve_waitlist(self, params):
+        """Reclaims the expired offers of a class and offers an available
+        ticket to the head of its waitlist.
+        """
+        sp.set_type(params, sp.TRecord(
+            class_id=sp.TNat,
+            expired_offers=sp.TList(sp.TAddress)).layout(("class_id", "expired_offers")))
+
+        # Check that no tez have been transferred
+        self.check_no_tez_transfer()
 
+        sp.verify(self.data.ticket_classes.contains(params.class_id), "MP_WRONG_CLASS_ID")
+        with sp.for_("user", params.expired_offers) as user:
+            self.reclaim_offer_(params.class_id, user)
+        ticket_class = self.data.ticket_classes[params.class_id]
+        bounds = sp.compute(self.data.waitlist_bounds.get(
+            params.class_id, sp.record(head=sp.nat(0), tail=sp.nat(0))))
+        with sp.if_(sp.len(params.expired_offers) == 0):
+            sp.verify(bounds.head < bounds.tail, "MP_EMPTY_WAITLIST")
+            sp.verify(ticket_class.sold + ticket_class.reserved < ticket_class.supply, "MP_SOLD_OUT")
+        self.serve_waitlist_(params.class_id)
+
+    @sp.entry_point
+    def refund_ticket(self, item_id):
+        """Refunds a class ticket to its buyer before the end of the class
+        sale. The ticket token is burned and the ticket is offered to the
+        head of the waitlist.
+
+        The buyer must have added the event contracts as an operator of the
+        ticket token.
+        """
+        sp.set_type(item_id, sp.TNat)
+
+        # Check that no tez have been transferred
+        self.check_no_tez_transfer()
+
+        class_id = sp.compute(self.data.class_tickets.get_opt(
+            item_id).open_some("MP_NOT_CLASS_TICKET"))
+        item = sp.compute(self.data.ticket_items[item_id])
+        sp.verify(item.state == TicketItemState.SOLD.value, "MP_WRONG_TICKET_STATE")
+        sp.verify(item.buyer.open_some() == sp.sender, "MP_NOT_TICKET_BUYER")
+        ticket_class = self.data.ticket_classes[class_id]
+        sp.verify(sp.now < ticket_class.sale_end, "MP_SALE_ENDED")
+        sp.verify(self.data.collected_fees >= item.price, "Not Enough Withdraw Balance!")
+
+        # burn the ticket token and send the ticket price back
+        c = sp.contract(
+            t=t_burn_params,
+            address=self.data.fa2,
+            entry_point="burn").open_some("MP_NO_BURN_ENTRYPOINT")
+        sp.transfer(
+            sp.list([sp.record(from_=sp.sender, token_id=item.token_id, amount=sp.nat(1))]),
+            sp.mutez(0),
+            c)
+        sp.send(sp.sender, item.price)
+        self.data.collected_fees -= item.price
+
+        self.data.ticket_items[item_id].state = TicketItemState.INACTIVE.value
+        del self.data.class_tickets[item_id]
+        ticket_class.sold = sp.as_nat(ticket_class.sold - 1)
+        self.serve_waitlist_(class_id)
 
     @sp.onchain_view()
     def get_administrator(self):
@@ -329,41 +648,59 @@ class Event(sp.Contract):
         sp.result(self.data.administrator)
 
     @sp.onchain_view()
-    def get_fee(self):
-        """Returns the Event fee.
+    def get_collected_fees(self):
+        """Returns the ticket fees and ticket class sales not checked out yet.
+        """
+        sp.result(self.data.collected_fees)
+
+    @sp.onchain_view()
+    def get_commission(self):
+        """Returns the Event commission.
         """
-        sp.result(self.data.fee)
+        sp.result(self.data.commission)
 
     @sp.onchain_view()
-    def get_fee_recipient(self):
-        """Returns the Event fee recipient address.
+    def get_commission_recipient(self):
+        """Returns the Event commission recipient address.
         """
-        sp.result(self.data.fee_recipient)
+        sp.result(self.data.commission_recipient)
 
-    def fa2_transfer(self, fa2, from_, to_, token_id, token_amount):
-        """Transfers a number of editions of a FA2 token between two addresses.
+    def fa2_mint(self, batch):
+        """Mints a batch of tickets calling the event FA2 contracts.
         """
-        # Get a handle to the FA2 token transfer entry point
         c = sp.contract(
-            t=sp.TList(sp.TRecord(
-                from_=sp.TAddress,
-                txs=sp.TList(sp.TRecord(
-                    to_=sp.TAddress,
-                    token_id=sp.TNat,
-                    amount=sp.TNat).layout(("to_", ("token_id", "amount")))))),
-            address=fa2,
-            entry_point="transfer").open_some()
-
-        # Transfer the FA2 token editions to the new address
-        sp.transfer(
-            arg=sp.list([sp.record(
-                from_=from_,
-                txs=sp.list([sp.record(
-                    to_=to_,
-                    token_id=token_id,
-                    amount=token_amount)]))]),
-            amount=sp.mutez(0),
-            destination=c)
+            t=t_mint_batch,
+            address=self.data.fa2,
+            entry_point="mint_bulk").open_some("MP_NO_MINT_ENTRYPOINT")
+        sp.transfer(batch, sp.mutez(0), c)
+
+    @sp.onchain_view()
+    def get_ticket_class(self, class_id):
+        """Returns a ticket class.
+        """
+        sp.set_type(class_id, sp.TNat)
+        sp.result(self.data.ticket_classes.get_opt(class_id).open_some("MP_WRONG_CLASS_ID"))
+
+    @sp.offchain_view()
+    def get_user_items(self, params):
+        """Returns the ticket item ids of a user with index in
+        [offset, offset + limit).
+        """
+        sp.set_type(
+            params,
+            sp.TRecord(
+                owner=sp.TAddress,
+                offset=sp.TNat,
+                limit=sp.TNat
+            ).layout(("owner", ("offset", "limit")))
+        )
+        page = sp.local("page", sp.list([], t=sp.TNat))
+        end = sp.compute(sp.min(
+            params.offset + params.limit,
+            self.data.user_item_counts.get(params.owner, sp.nat(0))))
+        with sp.for_("index", sp.range(params.offset, end)) as index:
+            page.value.push(self.data.user_items[sp.pair(params.owner, index)])
+        sp.result(page.value.rev())
 
     @sp.offchain_view()
     def get_contract_amount(self):
@@ -384,17 +721,253 @@ def test():
     creator=sp.address("tz1KozzwY6LrGDsZkTPLGwbh13HNezL21JMV"),
     metadata=sp.utils.metadata_of_url("ipfs://aaa"),
     nftfa2=sp.address("tz1KozzwY6LrGDsZkTPLGwbh13HNezL21JMV"),
-    tick_amount=sp.mutez(100),
+    tick_amount=sp.nat(100),
     tick_fee=sp.mutez(1000),
     threshold=sp.nat(10000000),
     commission=sp.nat(5),
     royalty=sp.nat(0),
     revenue=sp.nat(10),
     timeend=sp.int(10000),
-    shareaddress=sp.address("tz1KozzwY6LrGDMV"),
+    shareaddress=sp.address("tz1KozzwY6LrGDsZkTPLGwbh13HNezL21JMV"),
     )
     scenario += event
-  
-    # test
-    # scenario.h2("Playground Test 1")
-    # scenario += event.buy_ticket(item_id='1111').run(sender = admin, now = sp.timestamp(7))
\ No newline at end of file
+
+
+@sp.add_test(name="buy ticket")
+def test_buy_ticket():
+    scenario = sp.test_scenario()
+    nft_module = sp.io.import_script_from_url("file:contracts/NFT.py")
+
+    # Test address
+    admin = sp.test_account("admin")
+    alice = sp.test_account("alice")
+    bob = sp.test_account("bob")
+
+    # Create the ticket NFT and the event contracts
+    fa2 = nft_module.NFT(
+        administrator=admin.address,
+        metadata=sp.utils.metadata_of_url("ipfs://aaa"),
+    )
+    scenario += fa2
+    event = Event(
+        administrator=admin.address,
+        creator=admin.address,
+        metadata=sp.utils.metadata_of_url("ipfs://aaa"),
+        nftfa2=fa2.address,
+        tick_amount=sp.nat(100),
+        tick_fee=sp.mutez(1000),
+        threshold=sp.nat(10000000),
+        commission=sp.nat(5),
+        royalty=sp.nat(0),
+        revenue=sp.nat(10),
+        timeend=sp.int(10000),
+        shareaddress=admin.address,
+    )
+    scenario += event
+
+    # Alice lists a ticket and lets the event transfer it
+    fa2.mint([sp.record(metadata=sp.map({"": sp.bytes("0x00")}), to_=alice.address)]).run(sender=admin)
+    fa2.update_operators([sp.variant("add_operator", sp.record(
+        owner=alice.address, operator=event.address, token_id=0))]).run(sender=alice)
+    event.create_ticket_item(
+        contract_address=fa2.address, token_id=0, price=sp.tez(1)).run(
+            sender=bob, valid=False, exception="MP_NOT_TOKEN_OWNER")
+    event.create_ticket_item(
+        contract_address=fa2.address, token_id=0, price=sp.mutez(999)).run(
+            sender=alice, valid=False, exception="MP_PRICE_BELOW_FEE")
+    event.create_ticket_item(
+        contract_address=fa2.address, token_id=0, price=sp.tez(1)).run(sender=alice)
+    scenario.verify(event.data.ticket_items[1].fa2.is_none())
+    event.delete_ticket_item(1).run(
+        sender=bob, valid=False, exception="only the seller can delete an item")
+
+    scenario.h2("Buy a ticket")
+    event.buy_ticket(item_id=1).run(
+        sender=bob, amount=sp.tez(2), valid=False, exception="transaction token is not enough")
+    event.buy_ticket(item_id=1).run(sender=bob, amount=sp.tez(1))
+    scenario.verify(fa2.data.ledger[0] == bob.address)
+    scenario.verify(event.data.ticket_items[1].buyer == sp.some(bob.address))
+    scenario.verify(event.data.collected_fees == sp.mutez(1000))
+    scenario.verify(event.balance == sp.mutez(1000))
+    scenario.verify(event.get_user_items(sp.record(owner=bob.address, offset=0, limit=10)) == sp.list([1]))
+    event.buy_ticket(item_id=1).run(
+        sender=bob, amount=sp.tez(1), valid=False, exception="Ticket item not on sale!")
+
+    scenario.h2("Checkout the collected fees")
+    event.checkout_event(sp.mutez(1001)).run(
+        sender=admin, valid=False, exception="Not Enough Withdraw Balance!")
+    event.checkout_event(sp.mutez(1000)).run(sender=admin)
+    scenario.verify(event.data.collected_fees == sp.mutez(0))
+    scenario.verify(event.balance == sp.mutez(0))
+
+@sp.add_test(name="ticket classes")
+def test_ticket_classes():
+    scenario = sp.test_scenario()
+    nft_module = sp.io.import_script_from_url("file:contracts/NFT.py")
+
+    # Test address
+    admin = sp.test_account("admin")
+    alice = sp.test_account("alice")
+    bob = sp.test_account("bob")
+    carol = sp.test_account("carol")
+    dave = sp.test_account("dave")
+
+    # Create the ticket NFT and the event contracts, the event mints tickets
+    fa2 = nft_module.NFT(
+        administrator=admin.address,
+        metadata=sp.utils.metadata_of_url("ipfs://aaa"),
+    )
+    scenario += fa2
+    event = Event(
+        administrator=admin.address,
+        creator=admin.address,
+        metadata=sp.utils.metadata_of_url("ipfs://aaa"),
+        nftfa2=fa2.address,
+        tick_amount=sp.nat(3),
+        tick_fee=sp.mutez(1000),
+        threshold=sp.nat(10000000),
+        commission=sp.nat(5),
+        royalty=sp.nat(0),
+        revenue=sp.nat(10),
+        timeend=sp.int(10000),
+        shareaddress=admin.address,
+        offer_duration=30,
+    )
+    scenario += event
+    fa2.set_administrator(event.address).run(sender=admin)
+
+    scenario.h2("Create ticket classes")
+    event.create_ticket_class(
+        price=sp.tez(1), supply=2, sale_start=sp.timestamp(0), sale_end=sp.timestamp(100),
+        metadata=sp.map({"": sp.bytes("0x01")})).run(sender=admin)
+    event.create_ticket_class(
+        price=sp.tez(2), supply=2, sale_start=sp.timestamp(0), sale_end=sp.timestamp(100),
+        metadata=sp.map({"": sp.bytes("0x02")})).run(
+            sender=admin, valid=False, exception="MP_TICK_AMOUNT_EXCEEDED")
+    event.create_ticket_class(
+        price=sp.tez(2), supply=1, sale_start=sp.timestamp(50), sale_end=sp.timestamp(100),
+        metadata=sp.map({"": sp.bytes("0x02")})).run(sender=bob, valid=False, exception="MP_NOT_CREATOR")
+
+    scenario.h2("Buy tickets of a class")
+    event.buy_ticket_class(0).run(sender=bob, amount=sp.tez(1), now=sp.timestamp(10))
+    event.buy_ticket_class(0).run(sender=bob, amount=sp.tez(1), now=sp.timestamp(10))
+    scenario.verify(fa2.data.ledger[1] == bob.address)
+    scenario.verify(event.data.ticket_classes[0].sold == 2)
+    scenario.verify(event.data.ticket_items[2].token_id == 1)
+    scenario.verify(event.get_user_items(sp.record(owner=bob.address, offset=0, limit=10)) == sp.list([1, 2]))
+    scenario.verify(event.data.collected_fees == sp.tez(2))
+    event.buy_ticket_class(0).run(
+        sender=bob, amount=sp.tez(1), now=sp.timestamp(10), valid=False, exception="MP_SOLD_OUT")
+
+    scenario.h2("Buy several tickets in one operation")
+    event.create_ticket_class(
+        price=sp.tez(2), supply=1, sale_start=sp.timestamp(0), sale_end=sp.timestamp(100),
+        metadata=sp.map({"": sp.bytes("0x02")})).run(sender=admin)
+    event.buy_tickets([sp.record(class_id=1, quantity=2)]).run(
+        sender=bob, amount=sp.tez(4), now=sp.timestamp(10), valid=False, exception="MP_SOLD_OUT")
+    event.buy_tickets([sp.record(class_id=1, quantity=1)]).run(
+        sender=bob, amount=sp.tez(1), now=sp.timestamp(10), valid=False,
+        exception="transaction token is not enough")
+    event.buy_tickets([sp.record(class_id=1, quantity=1)]).run(
+        sender=bob, amount=sp.tez(2), now=sp.timestamp(10))
+    scenario.verify(fa2.data.ledger[2] == bob.address)
+    scenario.verify(event.data.collected_fees == sp.tez(4))
+    scenario.verify(event.data.ticket_items[3].token_id == 2)
+    scenario.verify(event.get_user_items(sp.record(owner=bob.address, offset=0, limit=10)) == sp.list([1, 2, 3]))
+
+    scenario.h2("Waitlist of a sold out class")
+    event.join_waitlist(0).run(sender=alice)
+    event.join_waitlist(0).run(sender=alice, valid=False, exception="MP_ALREADY_IN_WAITLIST")
+    event.join_waitlist(0).run(sender=carol)
+    event.join_waitlist(0).run(sender=dave)
+    event.serve_waitlist(class_id=0, expired_offers=[]).run(
+        sender=bob, valid=False, exception="MP_SOLD_OUT")
+
+    scenario.h2("Refund a ticket to the waitlist")
+    event.refund_ticket(1).run(
+        sender=alice, now=sp.timestamp(10), valid=False, exception="MP_NOT_TICKET_BUYER")
+    event.refund_ticket(1).run(
+        sender=bob, now=sp.timestamp(10), valid=False, exception="FA2_NOT_OPERATOR")
+    fa2.update_operators([sp.variant("add_operator", sp.record(
+        owner=bob.address, operator=event.address, token_id=0))]).run(sender=bob)
+    event.refund_ticket(1).run(sender=bob, now=sp.timestamp(10))
+    scenario.verify(~fa2.data.ledger.contains(0))
+    scenario.verify(event.data.ticket_items[1].state == TicketItemState.INACTIVE.value)
+    scenario.verify(event.data.collected_fees == sp.tez(3))
+    scenario.verify(event.data.ticket_classes[0].sold == 1)
+    scenario.verify(event.data.waitlist_offers[sp.pair(0, alice.address)] == sp.timestamp(40))
+    scenario.verify(event.data.ticket_classes[0].reserved == 1)
+    event.refund_ticket(1).run(
+        sender=bob, now=sp.timestamp(10), valid=False, exception="MP_NOT_CLASS_TICKET")
+    event.buy_ticket_class(0).run(
+        sender=bob, amount=sp.tez(1), now=sp.timestamp(10), valid=False, exception="MP_SOLD_OUT")
+
+    scenario.h2("Decline a waitlist offer")
+    event.leave_waitlist(0).run(sender=alice, now=sp.timestamp(15))
+    scenario.verify(~event.data.waitlist_offers.contains(sp.pair(0, alice.address)))
+    scenario.verify(event.data.waitlist_offers[sp.pair(0, carol.address)] == sp.timestamp(45))
+    scenario.verify(event.data.ticket_classes[0].reserved == 1)
+
+    scenario.h2("Reclaim an expired waitlist offer")
+    event.serve_waitlist(class_id=0, expired_offers=[carol.address]).run(
+        sender=bob, now=sp.timestamp(20), valid=False, exception="MP_OFFER_NOT_EXPIRED")
+    event.serve_waitlist(class_id=0, expired_offers=[alice.address]).run(
+        sender=bob, now=sp.timestamp(50), valid=False, exception="MP_NO_OFFER")
+    event.serve_waitlist(class_id=0, expired_offers=[carol.address]).run(
+        sender=bob, now=sp.timestamp(50))
+    scenario.verify(~event.data.waitlist_offers.contains(sp.pair(0, carol.address)))
+    scenario.verify(event.data.waitlist_offers[sp.pair(0, dave.address)] == sp.timestamp(80))
+    scenario.verify(event.data.waitlist_bounds[0].head == 3)
+    event.buy_ticket_class(0).run(sender=dave, amount=sp.tez(1), now=sp.timestamp(60))
+    scenario.verify(fa2.data.ledger[3] == dave.address)
+    scenario.verify(event.data.ticket_classes[0].sold == 2)
+    scenario.verify(event.data.ticket_classes[0].reserved == 0)
+    scenario.verify(event.data.collected_fees == sp.tez(4))
+    event.serve_waitlist(class_id=0, expired_offers=[]).run(
+        sender=bob, now=sp.timestamp(60), valid=False, exception="MP_EMPTY_WAITLIST")
+
+@sp.add_test(name="ticket item size")
+def test_ticket_item_size():
+    scenario = sp.test_scenario()
+    seller = sp.test_account("seller")
+    fa2 = sp.address("tz1KozzwY6LrGDsZkTPLGwbh13HNezL21JMV")
+
+    # Previous encoding with the FA2 address and a variant state
+    t_legacy_ticket_item = sp.TRecord(
+        id = sp.TNat,
+        address = sp.TAddress,
+        token_id = sp.TNat,
+        seller = sp.TAddress,
+        buyer = sp.TAddress,
+        price = sp.TMutez,
+        state = sp.TVariant(
+            created = sp.TAddress,
+            sold = sp.TAddress,
+            inactive = sp.TAddress,
+        )
+    )
+    legacy_item = sp.set_type_expr(sp.record(
+        id=sp.nat(9999),
+        address=fa2,
+        token_id=sp.nat(9999),
+        seller=seller.address,
+        buyer=seller.address,
+        price=sp.tez(10),
+        state=sp.variant("created", seller.address)
+    ), t_legacy_ticket_item)
+    item = sp.set_type_expr(sp.record(
+        id=sp.nat(9999),
+        fa2=sp.none,
+        token_id=sp.nat(9999),
+        seller=seller.address,
+        buyer=sp.none,
+        price=sp.tez(10),
+        state=TicketItemState.CREATED.value
+    ), t_ticket_item)
+
+    scenario.h2("Packed size of 10k ticket items (previous, compact)")
+    legacy_size = scenario.compute(sp.len(sp.pack(legacy_item)) * 10000)
+    size = scenario.compute(sp.len(sp.pack(item)) * 10000)
+    scenario.show(legacy_size)
+    scenario.show(size)
+    scenario.verify(size < legacy_size)
@@ -0,0 +1,445 @@
+import smartpy as sp
+
+market = sp.io.import_script_from_url("file:contracts/ticket_market.py")
+
+TicketItemState = market.TicketItemState
+t_ticket_item = market.t_event_ticket_item
+
+
+t_event = sp.TRecord(
+    creator = sp.TAddress,
+    fa2 = sp.TAddress,
+    tick_amount = sp.TNat,
+    tick_fee = sp.TMutez,
+    commission = sp.TNat,
+    threshold = sp.TNat,
+    royalty = sp.TNat,
+    revenue = sp.TNat,
+    timestart = sp.TTimestamp,
+    timeend = sp.TTimestamp,
+    ticket_paused = sp.TBool,
+    item_id = sp.TNat,
+    collected_fees = sp.TMutez
+)
+
+t_balance_of_request = sp.TRecord(owner=sp.TAddress, token_id=sp.TNat).layout(
+    ("owner", "token_id")
+)
+
+t_balance_of_response = sp.TRecord(
+    request=t_balance_of_request, balance=sp.TNat
+).layout(("request", "balance"))
+
+class EventRegistry(market.TicketMarket, sp.Contract):
+    """A class EventRegistry contracts for FatCowIO Trading Protocol .
+
+    Hosts many events keyed by `event_id`, creating an event is a single
+    big map entry instead of an `Event` origination.
+    """
+
+    def __init__(self, administrator, metadata, commission):
+        """Initializes the contracts.
+        """
+        # Initialize the contracts storage
+        self.init(
+            administrator=administrator,
+            proposed_administrator=sp.none,
+            metadata=metadata,
+            commission=commission,
+            commission_recipient=administrator,
+            event_id=sp.nat(0),
+            events=sp.big_map(
+                tkey=sp.TNat,
+                tvalue=t_event,
+            ),
+            # ticket items keyed by (event_id, item_id)
+            ticket_items=sp.big_map(
+                tkey=sp.TPair(sp.TNat, sp.TNat),
+                tvalue=t_ticket_item,
+            ),
+            # (event_id, item_id) of each user keyed by (user, index)
+            user_items=sp.big_map(
+                tkey=sp.TPair(sp.TAddress, sp.TNat),
+                tvalue=sp.TPair(sp.TNat, sp.TNat)
+            ),
+            user_item_counts=sp.big_map(
+                tkey=sp.TAddress,
+                tvalue=sp.TNat
+            ),
+            )
+
+    def check_is_administrator(self):
+        """Checks that the address that called the entry point is the contracts
+        administrator.
+        """
+        sp.verify(sp.sender == self.data.administrator, message="MP_NOT_ADMIN")
+
+    def check_is_event_administrator(self, event):
+        """Checks that the address that called the entry point is the event
+        creator or the contracts administrator.
+        """
+        sp.verify((sp.sender == event.creator) | (sp.sender == self.data.administrator),
+                  message="MP_NOT_EVENT_ADMIN")
+
+    def check_no_tez_transfer(self):
+        """Checks that no tez were transferred in the operation.
+        """
+        sp.verify(sp.amount == sp.tez(0), message="MP_TEZ_TRANSFER")
+
+    def check_is_token_owner(self, event, fa2, token_id):
+        """Checks that the address that called the entry point is the event
+        creator or owns the token, calling the FA2 contracts on-chain view.
+        """
+        with sp.if_(sp.sender != event.creator):
+            balances = sp.view(
+                name="get_balance_of",
+                address=fa2,
+                param=sp.list([sp.record(owner=sp.sender, token_id=token_id)]),
+                t=sp.TList(t_balance_of_response)).open_some("MP_NO_BALANCE_VIEW")
+            with sp.for_("response", balances) as response:
+                sp.verify(response.balance > 0, message="MP_NOT_TOKEN_OWNER")
+
+    def get_event(self, event_id):
+        """Returns the event record, failing if the event doesn't exist.
+        """
+        sp.verify(self.data.events.contains(event_id), message="MP_WRONG_EVENT_ID")
+        return self.data.events[event_id]
+
+    def add_user_item(self, owner, event_id, item_id):
+        """Appends a ticket item to the tickets of the owner, in constant
+        cost whatever the number of tickets the owner holds.
+        """
+        count = sp.compute(self.data.user_item_counts.get(owner, sp.nat(0)))
+        self.data.user_items[sp.pair(owner, count)] = sp.pair(event_id, item_id)
+        self.data.user_item_counts[owner] = count + 1
+
+    @sp.entry_point
+    def create_event(self, params):
+        """Creates a new event owned by the sender with an incremented id.
+        """
+        sp.set_type(
+            params,
+            sp.TRecord(
+                fa2=sp.TAddress,
+                tick_amount=sp.TNat,
+                tick_fee=sp.TMutez,
+                threshold=sp.TNat,
+                royalty=sp.TNat,
+                revenue=sp.TNat,
+                timeend=sp.TInt
+            )
+        )
+
+        # Check that no tez have been transferred
+        self.check_no_tez_transfer()
+
+        self.data.events[self.data.event_id] = sp.record(
+            creator=sp.sender,
+            fa2=params.fa2,
+            tick_amount=params.tick_amount,
+            tick_fee=params.tick_fee,
+            commission=self.data.commission,
+            threshold=params.threshold,
+            royalty=params.royalty,
+            revenue=params.revenue,
+            timestart=sp.now,
+            timeend=sp.now.add_seconds(params.timeend),
+            ticket_paused=False,
+            item_id=sp.nat(1),
+            collected_fees=sp.mutez(0)
+        )
+        self.data.event_id += 1
+
+    @sp.entry_point
+    def checkout_event(self, params):
+        """Pays out an amount of the fees collected by an event: the revenue
+        share to the administrator, the commission to the commission
+        recipient and the rest to the event creator.
+        """
+        sp.set_type(params, sp.TRecord(event_id=sp.TNat, amount=sp.TMutez))
+        self.check_is_administrator()
+        event = self.get_event(params.event_id)
+        sp.verify(event.collected_fees >= params.amount, "Not Enough Withdraw Balance!")
+        sp.verify(event.revenue + event.commission <= 1000, "MP_WRONG_SHARES")
+
+        #compute share contributors revenue
+        contributors_fee_amount = sp.local(
+                "contributors_fee_amount", sp.split_tokens(params.amount, event.revenue, 1000))
+
+        #compute commission fee
+        commission_fee_amount = sp.local(
+                "fatcow_commission_amount", sp.split_tokens(params.amount, event.commission, 1000))
+
+        event.collected_fees -= params.amount
+
+        #send to contributors
+        sp.send(self.data.administrator, contributors_fee_amount.value)
+
+        #send to commission
+        sp.send(self.data.commission_recipient, commission_fee_amount.value)
+
+        #send the rest to the event creator
+        sp.send(event.creator,
+                params.amount - contributors_fee_amount.value - commission_fee_amount.value)
+
+    @sp.entry_point
+    def create_ticket_item(self, params):
+        """
+        list an NFT on an event
+        """
+        sp.set_type(
+            params,
+            sp.TRecord(
+                event_id=sp.TNat,
+                contract_address=sp.TAddress,
+                token_id=sp.TNat,
+                price=sp.TMutez
+            ).layout(("event_id", ("contract_address", ("token_id", "price"))))
+        )
+        event = self.get_event(params.event_id)
+
+        # Check that the seller owns the token or is the event creator
+        self.check_is_token_owner(event, params.contract_address, params.token_id)
+
+        # Check that the price pays the ticket fee
+        sp.verify(params.price >= event.tick_fee, "MP_PRICE_BELOW_FEE")
+
+        item_id = sp.compute(event.item_id)
+        self.data.ticket_items[sp.pair(params.event_id, item_id)] = sp.record(
+            id=item_id,
+            fa2=sp.eif(params.contract_address == event.fa2, sp.none, sp.some(params.contract_address)),
+            token_id=params.token_id,
+            seller=sp.sender,
+            buyer=sp.none,
+            price=params.price,
+            state=TicketItemState.CREATED.value
+        )
+        event.item_id += sp.nat(1)
+
+    @sp.entry_point
+    def delete_ticket_item(self, params):
+        """
+        make the item inactive
+        """
+        sp.set_type(params, sp.TRecord(event_id=sp.TNat, item_id=sp.TNat))
+        key = sp.compute(sp.pair(params.event_id, params.item_id))
+        sp.verify(self.data.ticket_items.contains(key), "item is not exists")
+        item = self.data.ticket_items[key]
+        sp.verify(sp.sender == item.seller, "only the seller can delete an item")
+        with sp.if_(item.state == TicketItemState.CREATED.value):
+            item.state = TicketItemState.INACTIVE.value
+
+    @sp.entry_point
+    def set_pause_buy(self, params):
+        """Pause or not the ticket sales of an event.
+        """
+        sp.set_type(params, sp.TRecord(event_id=sp.TNat, pause=sp.TBool))
+        event = self.get_event(params.event_id)
+        self.check_is_event_administrator(event)
+        self.check_no_tez_transfer()
+        event.ticket_paused = params.pause
+
+    @sp.entry_point
+    def buy_ticket(self, params):
+        """Buys a ticket item of an event at its price.
+
+        The seller is paid the price minus the ticket fee, the fee is
+        accounted in the event `collected_fees`.
+        """
+        sp.set_type(params, sp.TRecord(event_id=sp.TNat, item_id=sp.TNat))
+        event = self.get_event(params.event_id)
+
+        # Check that the ticket sales are not paused
+        sp.verify(~event.ticket_paused, message="MP_TICKET_PAUSED")
+
+        key = sp.compute(sp.pair(params.event_id, params.item_id))
+        sp.verify(self.data.ticket_items.contains(key), "Ticket item not exist!")
+        item = self.data.ticket_items[key]
+        sp.verify(item.state == TicketItemState.CREATED.value, "Ticket item not on sale!")
+        sp.verify(item.price == sp.amount, "transaction token is not enough")
+
+        # account the ticket fee and pay the seller
+        event.collected_fees += event.tick_fee
+        sp.send(item.seller, sp.amount - event.tick_fee)
+
+        # transfer the ticket to the buyer
+        self.fa2_transfer(
+            fa2=sp.eif(item.fa2.is_some(), item.fa2.open_some(), event.fa2),
+            from_=item.seller,
+            to_=sp.sender,
+            token_id=item.token_id,
+            token_amount=1)
+
+        self.add_user_item(sp.sender, params.event_id, params.item_id)
+        item.buyer = sp.some(sp.sender)
+        item.state = TicketItemState.SOLD.value
+
+    @sp.entry_point
+    def update_commission(self, new_commission):
+        """Updates the commission of the events created from now on.
+        """
+        sp.set_type(new_commission, sp.TNat)
+        self.check_is_administrator()
+        self.check_no_tez_transfer()
+
+        # Check that the new commission is not larger than 25%
+        sp.verify(new_commission <= 250, message="MP_WRONG_COMMISSION")
+        self.data.commission = new_commission
+
+    @sp.entry_point
+    def transfer_administrator(self, proposed_administrator):
+        """Proposes to transfer the contracts administrator to another address.
+        """
+        # Define the input parameter data type
+        sp.set_type(proposed_administrator, sp.TAddress)
+
+        # Check that the administrator executed the entry point
+        self.check_is_administrator()
+
+        # Check that no tez have been transferred
+        self.check_no_tez_transfer()
+
+        # Set the new proposed administrator address
+        self.data.proposed_administrator = sp.some(proposed_administrator)
+
+    @sp.entry_point
+    def accept_administrator(self):
+        """The proposed administrator accepts the contracts administrator
+        responsabilities.
+        """
+        # Check that there is a proposed administrator
+        sp.verify(self.data.proposed_administrator.is_some(),
+                  message="MP_NO_NEW_ADMIN")
+
+        # Check that the proposed administrator executed the entry point
+        sp.verify(sp.sender == self.data.proposed_administrator.open_some(),
+                  message="MP_NOT_PROPOSED_ADMIN")
+
+        # Check that no tez have been transferred
+        self.check_no_tez_transfer()
+
+        # Set the new administrator address
+        self.data.administrator = sp.sender
+
+        # Reset the proposed administrator value
+        self.data.proposed_administrator = sp.none
+
+    @sp.onchain_view()
+    def get_administrator(self):
+        """Returns the EventRegistry administrator address.
+        """
+        sp.result(self.data.administrator)
+
+    @sp.onchain_view()
+    def get_event_info(self, event_id):
+        """Returns the record of an event.
+        """
+        sp.set_type(event_id, sp.TNat)
+        sp.result(self.data.events.get_opt(event_id).open_some("MP_WRONG_EVENT_ID"))
+
+    @sp.offchain_view()
+    def get_user_items(self, params):
+        """Returns the (event_id, item_id) of the tickets of a user with index
+        in [offset, offset + limit).
+        """
+        sp.set_type(
+            params,
+            sp.TRecord(
+                owner=sp.TAddress,
+                offset=sp.TNat,
+                limit=sp.TNat
+            ).layout(("owner", ("offset", "limit")))
+        )
+        page = sp.local("page", sp.list([], t=sp.TPair(sp.TNat, sp.TNat)))
+        end = sp.compute(sp.min(
+            params.offset + params.limit,
+            self.data.user_item_counts.get(params.owner, sp.nat(0))))
+        with sp.for_("index", sp.range(params.offset, end)) as index:
+            page.value.push(self.data.user_items[sp.pair(params.owner, index)])
+        sp.result(page.value.rev())
+
+
+@sp.add_test(name="event registry")
+def test():
+    scenario = sp.test_scenario()
+    nft_module = sp.io.import_script_from_url("file:contracts/NFT.py")
+
+    # Test address
+    admin = sp.test_account("admin")
+    alice = sp.test_account("alice")
+    bob = sp.test_account("bob")
+
+    # Create the ticket NFT and the registry contracts
+    fa2 = nft_module.NFT(
+        administrator=admin.address,
+        metadata=sp.utils.metadata_of_url("ipfs://aaa"),
+    )
+    scenario += fa2
+    registry = EventRegistry(
+        administrator=admin.address,
+        metadata=sp.utils.metadata_of_url("ipfs://aaa"),
+        commission=sp.nat(5),
+    )
+    scenario += registry
+
+    scenario.h2("Create two events")
+    for _ in range(2):
+        registry.create_event(
+            fa2=fa2.address,
+            tick_amount=sp.nat(100),
+            tick_fee=sp.mutez(1000),
+            threshold=sp.nat(10000000),
+            royalty=sp.nat(0),
+            revenue=sp.nat(10),
+            timeend=sp.int(10000),
+        ).run(sender=alice)
+    scenario.verify(registry.data.event_id == 2)
+
+    scenario.h2("Buy a ticket of the second event")
+    fa2.mint([sp.record(metadata=sp.map({"": sp.bytes("0x00")}), to_=alice.address)]).run(sender=admin)
+    fa2.update_operators([sp.variant("add_operator", sp.record(
+        owner=alice.address, operator=registry.address, token_id=0))]).run(sender=alice)
+    registry.create_ticket_item(
+        event_id=1, contract_address=fa2.address, token_id=0, price=sp.tez(1)).run(
+            sender=bob, valid=False, exception="MP_NOT_TOKEN_OWNER")
+    registry.create_ticket_item(
+        event_id=1, contract_address=fa2.address, token_id=0, price=sp.tez(1)).run(sender=alice)
+    registry.set_pause_buy(event_id=1, pause=True).run(sender=alice)
+    registry.buy_ticket(event_id=1, item_id=1).run(
+        sender=bob, amount=sp.tez(1), valid=False, exception="MP_TICKET_PAUSED")
+    registry.set_pause_buy(event_id=1, pause=False).run(sender=bob, valid=False)
+    registry.set_pause_buy(event_id=1, pause=False).run(sender=admin)
+    registry.buy_ticket(event_id=0, item_id=1).run(
+        sender=bob, amount=sp.tez(1), valid=False, exception="Ticket item not exist!")
+    registry.buy_ticket(event_id=1, item_id=1).run(sender=bob, amount=sp.tez(1))
+    scenario.verify(fa2.data.ledger[0] == bob.address)
+    scenario.verify(registry.data.events[1].collected_fees == sp.mutez(1000))
+    scenario.verify(registry.balance == sp.mutez(1000))
+    registry.delete_ticket_item(event_id=1, item_id=1).run(
+        sender=bob, valid=False, exception="only the seller can delete an item")
+
+    scenario.h2("Checkout the second event")
+    registry.checkout_event(event_id=1, amount=sp.mutez(1001)).run(
+        sender=admin, valid=False, exception="Not Enough Withdraw Balance!")
+    registry.checkout_event(event_id=1, amount=sp.mutez(1000)).run(sender=admin)
+    scenario.verify(registry.data.events[1].collected_fees == sp.mutez(0))
+    scenario.verify(registry.balance == sp.mutez(0))
+
+    scenario.h2("The revenue and commission shares can't exceed the fees")
+    registry.create_event(
+        fa2=fa2.address,
+        tick_amount=sp.nat(100),
+        tick_fee=sp.mutez(1000),
+        threshold=sp.nat(10000000),
+        royalty=sp.nat(0),
+        revenue=sp.nat(1000),
+        timeend=sp.int(10000),
+    ).run(sender=alice)
+    registry.checkout_event(event_id=2, amount=sp.mutez(0)).run(
+        sender=admin, valid=False, exception="MP_WRONG_SHARES")
+
+
+sp.add_compilation_target("EventRegistry", EventRegistry(
+    administrator=sp.address("tz1KozzwY6LrGDsZkTPLGwbh13HNezL21JMV"),
+    metadata=sp.utils.metadata_of_url("ipfs://aaa"),
+    commission=sp.nat(5)))
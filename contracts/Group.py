@@ -1,41 +1,23 @@
 import smartpy as sp
 
-t_ticket_item_state = sp.TVariant(
-    created = sp.TAddress,
-    release = sp.TAddress,
-    inactive = sp.TAddress,
-)
-
-t_ticket_item = sp.TRecord(
-    id = sp.TNat,
-    address = sp.TAddress,
-    token_id = sp.TNat,
-    seller = sp.TAddress,
-    buyer = sp.TOption(sp.TAddress),
-    price = sp.TMutez,
-    state = t_ticket_item_state
-)
-
-t_operator_permission = sp.TRecord(
-    owner=sp.TAddress, operator=sp.TAddress, token_id=sp.TNat
-).layout(("owner", ("operator", "token_id")))
-
-t_transfer_batch = sp.TRecord(
-    from_=sp.TAddress,
-    txs=sp.TList(
-        sp.TRecord(
-            to_=sp.TAddress,
-            token_id=sp.TNat,
-            amount=sp.TNat,
-        ).layout(("to_", ("token_id", "amount")))
-    ),
-).layout(("from_", "txs"))
+market = sp.io.import_script_from_url("file:contracts/ticket_market.py")
+
+TicketItemState = market.TicketItemState
+t_ticket_item = market.t_ticket_item
 
-t_transfer_params = sp.TList(t_transfer_batch)
+# the royalty shares can't exceed what is left after the largest fee
+MAX_ROYALTIES = 1000 - market.MAX_FEE
 
-class Group(sp.Contract):
+t_items_page_params = sp.TRecord(
+    owner=sp.TAddress,
+    offset=sp.TNat,
+    limit=sp.TNat,
+).layout(("owner", ("offset", "limit")))
+
+class Group(market.TicketMarket, sp.Contract):
     """A class Event contracts for FatCowIO Trading Protocol .
     """
+
     def __init__(self, administrator,creator, metadata, fa2, fee, threshold, royalty, revenue, timeend, groupaddress):
         """Initializes the contracts.
         """
@@ -53,13 +35,41 @@ class Group(sp.Contract):
             timeend=timeend,
             proposed_administrator=sp.none,
             collects_paused=False,
+            item_id=sp.nat(0),
             ticket_items=sp.big_map(
                 tkey=sp.TNat,
                 tvalue=t_ticket_item,
             ),
+            # items of each user keyed by (user, index) with a per-user counter
             user_items=sp.big_map(
+                tkey=sp.TPair(sp.TAddress, sp.TNat),
+                tvalue=sp.TNat
+            ),
+            user_item_indexes=sp.big_map(
+                tkey=sp.TPair(sp.TAddress, sp.TNat),
+                tvalue=sp.TNat
+            ),
+            user_item_counts=sp.big_map(
+                tkey=sp.TAddress,
+                tvalue=sp.TNat
+            ),
+            # listed items of each user, same layout as user_items
+            listed_items=sp.big_map(
+                tkey=sp.TPair(sp.TAddress, sp.TNat),
+                tvalue=sp.TNat
+            ),
+            listed_item_indexes=sp.big_map(
+                tkey=sp.TPair(sp.TAddress, sp.TNat),
+                tvalue=sp.TNat
+            ),
+            listed_item_counts=sp.big_map(
                 tkey=sp.TAddress,
-                tvalue=sp.TList(sp.TNat)
+                tvalue=sp.TNat
+            ),
+            # mutez credited by sales and not withdrawn yet
+            balances=sp.big_map(
+                tkey=sp.TAddress,
+                tvalue=sp.TMutez
             ),
             groupaddress=groupaddress)
 
@@ -74,6 +84,110 @@ class Group(sp.Contract):
         """
         sp.verify(sp.amount == sp.tez(0), message="MP_TEZ_TRANSFER")
 
+    def list_item_(self, fa2, token_id, price):
+        """Lists a token of the sender at a fixed price, with the royalty
+        shares of the token at listing time.
+        """
+        sp.verify(price > sp.mutez(0), "price must be at least 1 mutez")
+
+        # Check that no tez have been transferred, the fee is taken on sale
+        self.check_no_tez_transfer()
+
+        item_id = sp.compute(self.data.item_id)
+        # store in to the market database, relisting takes a new snapshot
+        self.data.ticket_items[item_id] = sp.record(
+            id=item_id,
+            fa2=self.fa2_override(fa2),
+            token_id=token_id,
+            seller=sp.sender,
+            buyer=sp.none,
+            price=price,
+            state=TicketItemState.CREATED.value,
+            royalties=self.token_royalty_shares(fa2, token_id, MAX_ROYALTIES)
+        )
+        # update the user record
+        self.add_indexed_item(
+            self.data.listed_items,
+            self.data.listed_item_indexes,
+            self.data.listed_item_counts,
+            sp.sender,
+            item_id)
+        # increase the item id
+        self.data.item_id += 1
+
+    def collect_item_(self, item_id):
+        """Sells a listed item to the sender at its price.
+
+        The price is credited to the royalty recipients of the item, the fee
+        recipient and the seller.
+        """
+        # Check that collects are not paused
+        sp.verify(~self.data.collects_paused, message="MP_COLLECTS_PAUSED")
+
+        # Check that the item is on sale
+        sp.verify(self.data.ticket_items.contains(item_id), message="MP_WRONG_ITEM_ID")
+        item = self.data.ticket_items[item_id]
+        sp.verify(item.state == TicketItemState.CREATED.value, message="MP_ITEM_NOT_ON_SALE")
+
+        # Check that the collector is not the seller of the item
+        sp.verify(sp.sender != item.seller, message="MP_IS_ITEM_SELLER")
+
+        # Check that the provided mutez amount is exactly the item price
+        sp.verify(sp.amount == item.price, message="MP_WRONG_TEZ_AMOUNT")
+
+        # Credit the royalties to the token minter
+        minter_royalties_amount = sp.local(
+            "minter_royalties_amount", sp.split_tokens(
+                sp.amount, item.royalties.minter_share, 1000))
+
+        self.credit(item.royalties.minter, minter_royalties_amount.value)
+
+        # Credit the royalties to the token creator
+        creator_royalties_amount = sp.local(
+            "creator_royalties_amount", sp.split_tokens(
+                sp.amount, item.royalties.creator_share, 1000))
+
+        self.credit(item.royalties.creator, creator_royalties_amount.value)
+
+        # Credit the management fees
+        fee_amount = sp.local(
+            "fee_amount", sp.split_tokens(sp.amount, self.data.fee, 1000))
+
+        self.credit(self.data.fee_recipient, fee_amount.value)
+
+        # Credit what is left to the seller
+        self.credit(item.seller,
+                    sp.amount -
+                    minter_royalties_amount.value -
+                    creator_royalties_amount.value -
+                    fee_amount.value)
+
+        # Transfer the token to the collector
+        self.fa2_transfer(
+            fa2=self.ticket_item_fa2(item),
+            from_=item.seller,
+            to_=sp.sender,
+            token_id=item.token_id,
+            token_amount=1)
+
+        # update the listed and purchase lists
+        self.remove_indexed_item(
+            self.data.listed_items,
+            self.data.listed_item_indexes,
+            self.data.listed_item_counts,
+            item.seller,
+            item_id)
+        self.add_indexed_item(
+            self.data.user_items,
+            self.data.user_item_indexes,
+            self.data.user_item_counts,
+            sp.sender,
+            item_id)
+
+        # update the item state
+        item.buyer = sp.some(sp.sender)
+        item.state = TicketItemState.SOLD.value
+
     @sp.entry_point
     def crerate_ticket_item(self, params):
         """
@@ -92,33 +206,7 @@ class Group(sp.Contract):
                 price=sp.TMutez
             ).layout(("contract_address", ("token_id", "price")))
         )
-        sp.verify(params.price > sp.mutez(0), "price must be at least 1 mutez")
-        sp.verify(sp.amount == self.data.list_fee, "fee must be equal to listing fee")
-
-        # current FA2 contracts has no on-chain view
-        is_operator = sp.contract(
-            t_operator_permission,
-            params.contract_address,
-            "is_operator"
-        ).open_some("is_operator must be defined")
-
-        item_id = self.data.item_id
-        item = sp.record(
-            id=item_id,
-            address=params.contract_address,
-            token_id=params.token_id,
-            seller=sp.sender,
-            buyer=sp.none,
-            price=params.price,
-            state=sp.variant("created", sp.sender)
-        )
-        self.data.ticket_items[item_id] = item
-        with sp.if_(self.data.user_items.contains(sp.sender)):
-            self.data.user_items[sp.sender].push(item_id)
-        with sp.else_():
-            self.data.user_items[sp.sender] = sp.list([item_id], t=sp.TNat)
-
-        self.data.item_id += sp.nat(1)
+        self.list_item_(params.contract_address, params.token_id, params.price)
 
     @sp.entry_point
     def create_ticket_sale(self, params):
@@ -130,37 +218,9 @@ class Group(sp.Contract):
             ).layout(("address", "item_id"))
         )
         sp.verify(self.data.ticket_items.contains(params.item_id), "item is not exists")
-        item = self.data.ticket_items[params.item_id]
-        sp.verify(item.price == sp.amount, "please the asking price")
-        transfer = sp.contract(t_transfer_params, params.address, "transfer").open_some("address is not a FA2 contracts")
-
-        # transfer amount
-        sp.transfer(sp.list([
-            sp.record(
-                from_=item.seller,
-                txs=sp.list([
-                    sp.record(
-                        to_=sp.sender,
-                        token_id=item.token_id,
-                        amount=sp.nat(1)
-                    )
-                ])
-            )
-        ], t=t_transfer_batch), sp.tez(0), transfer)
-
-        profit = sp.amount - self.data.list_fee
-        sp.send(self.data.owner_address, self.data.list_fee)
-        sp.send(item.seller, profit)
-
-        item_id = item.id
-
-        with sp.if_(self.data.user_items.contains(sp.sender)):
-            self.data.user_items[sp.sender].push(item_id)
-        with sp.else_():
-            self.data.user_items[sp.sender] = sp.list([item_id], t=sp.TNat)
-
-        item.buyer = sp.some(sp.sender)
-        item.state = sp.variant("release", sp.sender)
+        sp.verify(self.ticket_item_fa2(self.data.ticket_items[params.item_id]) == params.address,
+                  "address is not the item FA2 contracts")
+        self.collect_item_(params.item_id)
 
     @sp.entry_point
     def list_ticket(self, params):
@@ -170,25 +230,7 @@ class Group(sp.Contract):
                        token_id = sp.TNat,
                        price = sp.TMutez)
         )
-        sp.verify(params.price > sp.mutez(0), "price must be at lease 1 mutez")
-        sp.verify(sp.amount == self.data.fee, "fee must be equal to the listing ")
-        item_id = self.data.next_item_id
-        item = sp.record(
-            id=item_id,
-            address=params.address,
-            token_id=params.token_id,
-            seller=sp.source,
-            buyer=sp.none,
-            state=sp.varint("created", sp.source)
-        )
-        # store in to the market database
-        self.data.ticket_items[item_id] = item
-        # update the user record
-        self.data.my_listed_items[sp.source][item_id] = sp.unit
-        # charge the list fee
-        sp.send(self.owner, self.data.fee)
-        # increase the item id
-        self.data.next_item_id += 1
+        self.list_item_(params.address, params.token_id, params.price)
 
     @sp.entry_point
     def buy_ticket(self, params):
@@ -198,118 +240,30 @@ class Group(sp.Contract):
                 item_id=sp.TNat,
             )
         )
-
-        sp.verify(self.data.ticket_items.contains(params.item_id), "ticket item")
-        item = self.data.ticket_items[params.item_id]
-        sp.verify(item.price == sp.amount, "transaction token is not enough")
-        transfer_call = sp.contract(t_transfer_params, item.address, "transfer")
-        # call FA2
-        sp.transfer(sp.list([sp.record(
-                from_=item.seller,
-                txs=sp.list([
-                    sp.record(
-                        to_=sp.sender,
-                        token_id=item.id,
-                        amount=sp.nat(1)
-                    )
-                ])
-            )
-        ], t=t_transfer_batch), sp.tez(0), transfer_call)
-        # calculate the profit
-        sp.send(item.seller, sp.amount)
-        # update the purchase list
-        self.data.my_purchase_items[sp.source][item.id] = sp.unit
-        # update the listed list
-        del self.data.my_listed_items[item.seller][item.id]
-        # update the item state
-        item.state = sp.varint("release", sp.source)
-        self.ticket_items[item.id] = item
+        self.collect_item_(params.item_id)
 
     @sp.entry_point
-    def collect(self, swap_id):
-        """Collects one edition of a token that has already been swapped.
+    def collect(self, item_id):
+        """Collects a listed item at its price.
         """
         # Define the input parameter data type
-        sp.set_type(swap_id, sp.TNat)
-
-        # Check that collects are not paused
-        sp.verify(~self.data.collects_paused, message="MP_COLLECTS_PAUSED")
-
-        # Check that the swap id is present in the swaps big map
-        sp.verify(self.data.swaps.contains(swap_id), message="MP_WRONG_SWAP_ID")
-
-        # Check that the collector is not the creator of the swap
-        swap = sp.local("swap", self.data.swaps[swap_id])
-        sp.verify(sp.sender != swap.value.issuer, message="MP_IS_SWAP_ISSUER")
-
-        # Check that there is at least one edition available to collect
-        sp.verify(swap.value.editions > 0, message="MP_SWAP_COLLECTED")
-
-        # Check that the provided mutez amount is exactly the edition price
-        sp.verify(sp.amount == swap.value.price, message="MP_WRONG_TEZ_AMOUNT")
-
-        # Handle tez tranfers if the edition price is not zero
-        with sp.if_(sp.amount != sp.mutez(0)):
-            # Get the royalties information from the FA2 token contracts
-            royalties = sp.local(
-                "royalties", self.get_token_royalties(swap.value.token_id))
-
-            # Send the royalties to the token minter
-            minter_royalties_amount = sp.local(
-                "minter_royalties_amount", sp.split_tokens(
-                    sp.amount, royalties.value.minter.royalties, 1000))
-
-            with sp.if_(minter_royalties_amount.value > sp.mutez(0)):
-                sp.send(royalties.value.minter.address,
-                        minter_royalties_amount.value)
-
-            # Send the royalties to the token creator
-            creator_royalties_amount = sp.local(
-                "creator_royalties_amount", sp.split_tokens(
-                    sp.amount, royalties.value.creator.royalties, 1000))
-
-            with sp.if_(creator_royalties_amount.value > sp.mutez(0)):
-                sp.send(royalties.value.creator.address,
-                        creator_royalties_amount.value)
-
-            # Send the management fees
-            fee_amount = sp.local(
-                "fee_amount", sp.split_tokens(sp.amount, self.data.fee, 1000))
+        sp.set_type(item_id, sp.TNat)
+        self.collect_item_(item_id)
 
-            with sp.if_(fee_amount.value > sp.mutez(0)):
-                sp.send(self.data.fee_recipient, fee_amount.value)
-
-            # Send the donations
-            donation_amount = sp.local("donation_amount", sp.mutez(0))
-            total_donations_amount = sp.local(
-                "total_donations_amount", sp.mutez(0))
-
-            with sp.for_("org_donation", swap.value.donations) as org_donation:
-                donation_amount.value = sp.split_tokens(
-                    sp.amount, org_donation.donation, 1000)
-
-                with sp.if_(donation_amount.value > sp.mutez(0)):
-                    sp.send(org_donation.address, donation_amount.value)
-                    total_donations_amount.value += donation_amount.value
-
-            # Send what is left to the swap issuer
-            sp.send(swap.value.issuer,
-                    sp.amount -
-                    minter_royalties_amount.value -
-                    creator_royalties_amount.value -
-                    fee_amount.value -
-                    total_donations_amount.value)
+    @sp.entry_point
+    def withdraw(self):
+        """Sends the whole credited balance of the sender to the sender.
+        """
+        # Check that no tez have been transferred
+        self.check_no_tez_transfer()
 
-        # Transfer the token edition to the collector
-        self.fa2_transfer(
-            fa2=self.data.fa2,
-            from_=sp.self_address,
-            to_=sp.sender,
-            token_id=swap.value.token_id,
-            token_amount=1)
+        # Check that the sender has something to withdraw
+        amount = sp.compute(self.data.balances.get_opt(sp.sender).open_some(
+            "MP_NO_BALANCE"))
 
-        # Update the number of editions available in the swaps big map
-        self.data.swaps[swap_id].editions = sp.as_nat(swap.value.editions - 1)
+        # Reset the balance before sending it
+        del self.data.balances[sp.sender]
+        sp.send(sp.sender, amount)
 
     @sp.entry_point
     def delete_ticket_item(self, params):
@@ -320,8 +274,15 @@ class Group(sp.Contract):
         sp.verify(params < self.data.item_id, "id must < current id")
         sp.verify(self.data.ticket_items.contains(params), "item is not exists")
         item = self.data.ticket_items[params]
-        with sp.if_(item.state.is_variant("created")):
-            item.state = sp.variant("inactive", sp.sender)
+        sp.verify(sp.sender == item.seller, "only the seller can delete an item")
+        with sp.if_(item.state == TicketItemState.CREATED.value):
+            item.state = TicketItemState.INACTIVE.value
+            self.remove_indexed_item(
+                self.data.listed_items,
+                self.data.listed_item_indexes,
+                self.data.listed_item_counts,
+                item.seller,
+                params)
 
     @sp.entry_point
     def update_fee(self, new_fee):
@@ -337,7 +298,7 @@ class Group(sp.Contract):
         self.check_no_tez_transfer()
 
         # Check that the new fee is not larger than 25%
-        sp.verify(new_fee <= 250, message="MP_WRONG_FEES")
+        sp.verify(new_fee <= market.MAX_FEE, message="MP_WRONG_FEES")
 
         # Set the new management fee
         self.data.fee = new_fee
@@ -418,6 +379,37 @@ class Group(sp.Contract):
         """
         sp.result(self.data.administrator)
 
+    @sp.onchain_view()
+    def get_user_items(self, params):
+        """Returns a page of the item ids of a user.
+        """
+        sp.set_type(params, t_items_page_params)
+        sp.result(self.indexed_items_page(
+            self.data.user_items,
+            self.data.user_item_counts,
+            params.owner,
+            params.offset,
+            params.limit))
+
+    @sp.onchain_view()
+    def get_listed_items(self, params):
+        """Returns a page of the item ids listed by a user.
+        """
+        sp.set_type(params, t_items_page_params)
+        sp.result(self.indexed_items_page(
+            self.data.listed_items,
+            self.data.listed_item_counts,
+            params.owner,
+            params.offset,
+            params.limit))
+
+    @sp.onchain_view()
+    def get_balance(self, address):
+        """Returns the mutez credited to an address and not withdrawn yet.
+        """
+        sp.set_type(address, sp.TAddress)
+        sp.result(self.data.balances.get(address, sp.mutez(0)))
+
     @sp.onchain_view()
     def get_fee(self):
         """Returns the Event fee.
@@ -430,44 +422,160 @@ class Group(sp.Contract):
         """
         sp.result(self.data.fee_recipient)
 
-    def fa2_transfer(self, fa2, from_, to_, token_id, token_amount):
-        """Transfers a number of editions of a FA2 token between two addresses.
-        """
-        # Get a handle to the FA2 token transfer entry point
-        c = sp.contract(
-            t=sp.TList(sp.TRecord(
-                from_=sp.TAddress,
-                txs=sp.TList(sp.TRecord(
-                    to_=sp.TAddress,
-                    token_id=sp.TNat,
-                    amount=sp.TNat).layout(("to_", ("token_id", "amount")))))),
-            address=fa2,
-            entry_point="transfer").open_some()
-
-        # Transfer the FA2 token editions to the new address
-        sp.transfer(
-            arg=sp.list([sp.record(
-                from_=from_,
-                txs=sp.list([sp.record(
-                    to_=to_,
-                    token_id=token_id,
-                    amount=token_amount)]))]),
-            amount=sp.mutez(0),
-            destination=c)
-
-    def get_token_royalties(self, token_id):
-        """Gets the token royalties information calling the FA2 contracts
-        on-chain view.
-        """
-        return sp.view(
-            name="token_royalties",
-            address=self.data.fa2,
-            param=token_id,
-            t=sp.TRecord(
-                minter=Group.USER_ROYALTIES_TYPE,
-                creator=Group.USER_ROYALTIES_TYPE).layout(
-                        ("minter", "creator"))
-            ).open_some()
+
+def get_test_environment(scenario):
+    """Originates a ticket NFT with three tokens of alice and a Group on it,
+    the Group being operator of the tokens."""
+    nft_module = sp.io.import_script_from_url("file:contracts/NFT.py")
+    admin = sp.test_account("admin")
+    alice = sp.test_account("alice")
+    bob = sp.test_account("bob")
+    fa2 = nft_module.NFT(
+        administrator=admin.address,
+        metadata=sp.utils.metadata_of_url("ipfs://aaa"),
+    )
+    scenario += fa2
+    group = Group(
+        administrator=admin.address,
+        creator=admin.address,
+        metadata=sp.utils.metadata_of_url("ipfs://aaa"),
+        fa2=fa2.address,
+        fee=sp.nat(25),
+        threshold=sp.nat(0),
+        royalty=sp.nat(0),
+        revenue=sp.nat(0),
+        timeend=sp.nat(0),
+        groupaddress=admin.address,
+    )
+    scenario += group
+    fa2.mint([sp.record(metadata=sp.map({"": sp.bytes("0x00")}), to_=alice.address)
+              for _ in range(3)]).run(sender=admin)
+    fa2.update_operators([sp.variant("add_operator", sp.record(
+        owner=alice.address, operator=group.address, token_id=token_id))
+        for token_id in range(3)]).run(sender=alice)
+    return fa2, group, admin, alice, bob
+
+
+@sp.add_test(name="group indexes")
+def test_group_indexes():
+    scenario = sp.test_scenario()
+    fa2, group, admin, alice, bob = get_test_environment(scenario)
+
+    scenario.h2("Listing appends to the listed items")
+    for token_id in range(3):
+        group.list_ticket(address=fa2.address, token_id=token_id, price=sp.tez(1)).run(sender=alice)
+    scenario.verify(group.get_listed_items(
+        sp.record(owner=alice.address, offset=0, limit=10)) == sp.list([0, 1, 2]))
+    scenario.verify(group.get_listed_items(
+        sp.record(owner=alice.address, offset=1, limit=1)) == sp.list([1]))
+    scenario.verify(group.get_listed_items(
+        sp.record(owner=alice.address, offset=5, limit=1)) == sp.list([]))
+
+    scenario.h2("A sale moves the last listed item into the freed index")
+    group.collect(0).run(sender=bob, amount=sp.tez(1))
+    scenario.verify(group.get_listed_items(
+        sp.record(owner=alice.address, offset=0, limit=10)) == sp.list([2, 1]))
+    scenario.verify(group.get_user_items(
+        sp.record(owner=bob.address, offset=0, limit=10)) == sp.list([0]))
+
+    scenario.h2("Deleting an item removes it from the listed items")
+    group.delete_ticket_item(1).run(sender=bob, valid=False, exception="only the seller can delete an item")
+    group.delete_ticket_item(1).run(sender=alice)
+    scenario.verify(group.get_listed_items(
+        sp.record(owner=alice.address, offset=0, limit=10)) == sp.list([2]))
+    scenario.verify(group.data.listed_item_counts[alice.address] == 1)
+
+
+@sp.add_test(name="group balances")
+def test_group_balances():
+    scenario = sp.test_scenario()
+    fa2, group, admin, alice, bob = get_test_environment(scenario)
+
+    scenario.h2("A sale credits the fee recipient and the seller")
+    group.list_ticket(address=fa2.address, token_id=0, price=sp.tez(1)).run(sender=alice)
+    group.collect(0).run(sender=bob, amount=sp.tez(1))
+    scenario.verify(group.get_balance(admin.address) == sp.mutez(25000))
+    scenario.verify(group.get_balance(alice.address) == sp.mutez(975000))
+    scenario.verify(group.balance == sp.tez(1))
+
+    scenario.h2("Withdraw the credited balance")
+    group.withdraw().run(sender=alice, amount=sp.mutez(1), valid=False, exception="MP_TEZ_TRANSFER")
+    group.withdraw().run(sender=alice)
+    scenario.verify(group.get_balance(alice.address) == sp.mutez(0))
+    scenario.verify(group.balance == sp.mutez(25000))
+    group.withdraw().run(sender=alice, valid=False, exception="MP_NO_BALANCE")
+    group.withdraw().run(sender=bob, valid=False, exception="MP_NO_BALANCE")
+    group.withdraw().run(sender=admin)
+    scenario.verify(group.balance == sp.mutez(0))
+
+
+@sp.add_test(name="group royalties")
+def test_group_royalties():
+    scenario = sp.test_scenario()
+    fa2, group, admin, alice, bob = get_test_environment(scenario)
+    minter = sp.test_account("minter")
+    creator = sp.test_account("creator")
+
+    scenario.h2("Royalty shares above MAX_ROYALTIES can't be listed")
+    high_royalties = market.RoyaltiesTestFA2(
+        minter=minter.address, creator=creator.address, share=sp.nat(400))
+    scenario += high_royalties
+    group.list_ticket(address=high_royalties.address, token_id=0, price=sp.tez(1)).run(
+        sender=alice, valid=False, exception="MP_WRONG_ROYALTIES")
+
+    scenario.h2("A sale credits the royalties taken when the token was listed")
+    royalties = market.RoyaltiesTestFA2(
+        minter=minter.address, creator=creator.address, share=sp.nat(300))
+    scenario += royalties
+    group.list_ticket(address=royalties.address, token_id=0, price=sp.tez(1)).run(sender=alice)
+    scenario.verify(group.data.ticket_items[0].royalties.minter == minter.address)
+    scenario.verify(group.data.ticket_items[0].royalties.creator_share == 300)
+    group.collect(0).run(sender=bob, amount=sp.tez(1))
+    scenario.verify(group.get_balance(minter.address) == sp.mutez(300000))
+    scenario.verify(group.get_balance(creator.address) == sp.mutez(300000))
+    scenario.verify(group.get_balance(admin.address) == sp.mutez(25000))
+    scenario.verify(group.get_balance(alice.address) == sp.mutez(375000))
+
+
+@sp.add_test(name="group items")
+def test_group_items():
+    scenario = sp.test_scenario()
+    fa2, group, admin, alice, bob = get_test_environment(scenario)
+    nft_module = sp.io.import_script_from_url("file:contracts/NFT.py")
+
+    scenario.h2("Item state transitions")
+    group.list_ticket(address=fa2.address, token_id=0, price=sp.tez(1)).run(sender=alice)
+    group.list_ticket(address=fa2.address, token_id=1, price=sp.tez(1)).run(sender=alice)
+    scenario.verify(group.data.ticket_items[0].state == TicketItemState.CREATED.value)
+    group.collect(0).run(sender=alice, amount=sp.tez(1), valid=False, exception="MP_IS_ITEM_SELLER")
+    group.collect(0).run(sender=bob, amount=sp.tez(2), valid=False, exception="MP_WRONG_TEZ_AMOUNT")
+    group.collect(0).run(sender=bob, amount=sp.tez(1))
+    scenario.verify(group.data.ticket_items[0].state == TicketItemState.SOLD.value)
+    scenario.verify(group.data.ticket_items[0].buyer == sp.some(bob.address))
+    group.buy_ticket(item_id=0).run(sender=bob, amount=sp.tez(1), valid=False, exception="MP_ITEM_NOT_ON_SALE")
+    group.delete_ticket_item(0).run(sender=alice)
+    scenario.verify(group.data.ticket_items[0].state == TicketItemState.SOLD.value)
+    group.delete_ticket_item(1).run(sender=alice)
+    scenario.verify(group.data.ticket_items[1].state == TicketItemState.INACTIVE.value)
+    group.buy_ticket(item_id=1).run(sender=bob, amount=sp.tez(1), valid=False, exception="MP_ITEM_NOT_ON_SALE")
+
+    scenario.h2("An item of another FA2 keeps its address")
+    other = nft_module.NFT(
+        administrator=admin.address,
+        metadata=sp.utils.metadata_of_url("ipfs://bbb"),
+    )
+    scenario += other
+    other.mint([sp.record(metadata=sp.map({"": sp.bytes("0x00")}), to_=alice.address)]).run(sender=admin)
+    other.update_operators([sp.variant("add_operator", sp.record(
+        owner=alice.address, operator=group.address, token_id=0))]).run(sender=alice)
+    group.list_ticket(address=other.address, token_id=0, price=sp.tez(1)).run(sender=alice)
+    scenario.verify(group.data.ticket_items[1].fa2.is_none())
+    scenario.verify(group.data.ticket_items[2].fa2 == sp.some(other.address))
+    group.create_ticket_sale(address=fa2.address, item_id=2).run(
+        sender=bob, amount=sp.tez(1), valid=False, exception="address is not the item FA2 contracts")
+    group.create_ticket_sale(address=other.address, item_id=2).run(sender=bob, amount=sp.tez(1))
+    scenario.verify(other.data.ledger[0] == bob.address)
+    scenario.verify(fa2.data.ledger[2] == alice.address)
 
 
 sp.add_compilation_target("Group", Group(
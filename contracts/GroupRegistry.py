@@ -0,0 +1,528 @@
+import smartpy as sp
+
+market = sp.io.import_script_from_url("file:contracts/ticket_market.py")
+
+TicketItemState = market.TicketItemState
+t_ticket_item = market.t_ticket_item
+
+# the largest per-mille revenue share of a group
+MAX_REVENUE = 250
+
+# the royalty shares can't exceed what is left after the largest fee and
+# group revenue share
+MAX_ROYALTIES = 1000 - market.MAX_FEE - MAX_REVENUE
+
+t_group = sp.TRecord(
+    creator = sp.TAddress,
+    groupaddress = sp.TAddress,
+    threshold = sp.TNat,
+    royalty = sp.TNat,
+    revenue = sp.TNat,
+    timeend = sp.TTimestamp,
+    item_id = sp.TNat
+)
+
+t_items_page_params = sp.TRecord(
+    group_id=sp.TNat,
+    owner=sp.TAddress,
+    offset=sp.TNat,
+    limit=sp.TNat,
+).layout(("group_id", ("owner", ("offset", "limit"))))
+
+class GroupRegistry(market.TicketMarket, sp.Contract):
+    """A class GroupRegistry contracts for FatCowIO Trading Protocol .
+
+    Hosts many trading groups keyed by `group_id`, creating a group is a
+    single big map entry instead of a `Group` origination.
+    """
+
+    def __init__(self, administrator, metadata, fa2, fee):
+        """Initializes the contracts.
+        """
+        # Initialize the contracts storage
+        self.init(
+            administrator=administrator,
+            metadata=metadata,
+            fa2=fa2,
+            fee=fee,
+            fee_recipient=administrator,
+            proposed_administrator=sp.none,
+            collects_paused=False,
+            group_id=sp.nat(0),
+            groups=sp.big_map(
+                tkey=sp.TNat,
+                tvalue=t_group,
+            ),
+            # ticket items keyed by (group_id, item_id)
+            ticket_items=sp.big_map(
+                tkey=sp.TPair(sp.TNat, sp.TNat),
+                tvalue=t_ticket_item,
+            ),
+            # items of each (group_id, user) keyed by ((group_id, user), index)
+            user_items=sp.big_map(
+                tkey=sp.TPair(sp.TPair(sp.TNat, sp.TAddress), sp.TNat),
+                tvalue=sp.TNat
+            ),
+            user_item_indexes=sp.big_map(
+                tkey=sp.TPair(sp.TPair(sp.TNat, sp.TAddress), sp.TNat),
+                tvalue=sp.TNat
+            ),
+            user_item_counts=sp.big_map(
+                tkey=sp.TPair(sp.TNat, sp.TAddress),
+                tvalue=sp.TNat
+            ),
+            # listed items of each (group_id, user), same layout as user_items
+            listed_items=sp.big_map(
+                tkey=sp.TPair(sp.TPair(sp.TNat, sp.TAddress), sp.TNat),
+                tvalue=sp.TNat
+            ),
+            listed_item_indexes=sp.big_map(
+                tkey=sp.TPair(sp.TPair(sp.TNat, sp.TAddress), sp.TNat),
+                tvalue=sp.TNat
+            ),
+            listed_item_counts=sp.big_map(
+                tkey=sp.TPair(sp.TNat, sp.TAddress),
+                tvalue=sp.TNat
+            ),
+            # mutez credited by sales and not withdrawn yet
+            balances=sp.big_map(
+                tkey=sp.TAddress,
+                tvalue=sp.TMutez
+            ))
+
+    def check_is_administrator(self):
+        """Checks that the address that called the entry point is the contracts
+        administrator.
+        """
+        sp.verify(sp.sender == self.data.administrator, message="MP_NOT_ADMIN")
+
+    def check_no_tez_transfer(self):
+        """Checks that no tez were transferred in the operation.
+        """
+        sp.verify(sp.amount == sp.tez(0), message="MP_TEZ_TRANSFER")
+
+    def get_group(self, group_id):
+        """Returns the group record, failing if the group doesn't exist.
+        """
+        sp.verify(self.data.groups.contains(group_id), message="MP_WRONG_GROUP_ID")
+        return self.data.groups[group_id]
+
+    @sp.entry_point
+    def create_group(self, params):
+        """Creates a new trading group owned by the sender with an incremented
+        id.
+        """
+        sp.set_type(
+            params,
+            sp.TRecord(
+                groupaddress=sp.TAddress,
+                threshold=sp.TNat,
+                royalty=sp.TNat,
+                revenue=sp.TNat,
+                timeend=sp.TInt
+            )
+        )
+
+        # Check that no tez have been transferred
+        self.check_no_tez_transfer()
+
+        # Check that the group revenue share is not larger than 25%
+        sp.verify(params.revenue <= MAX_REVENUE, message="MP_WRONG_REVENUE")
+
+        self.data.groups[self.data.group_id] = sp.record(
+            creator=sp.sender,
+            groupaddress=params.groupaddress,
+            threshold=params.threshold,
+            royalty=params.royalty,
+            revenue=params.revenue,
+            timeend=sp.now.add_seconds(params.timeend),
+            item_id=sp.nat(0)
+        )
+        self.data.group_id += 1
+
+    @sp.entry_point
+    def list_ticket(self, params):
+        """Lists a FA2 token in a group at a fixed price.
+        """
+        sp.set_type(
+            params,
+            sp.TRecord(group_id = sp.TNat,
+                       address = sp.TAddress,
+                       token_id = sp.TNat,
+                       price = sp.TMutez)
+        )
+        group = self.get_group(params.group_id)
+        sp.verify(sp.now < group.timeend, "group is closed")
+        sp.verify(params.price > sp.mutez(0), "price must be at lease 1 mutez")
+
+        # Check that no tez have been transferred, the fee is taken on sale
+        self.check_no_tez_transfer()
+
+        item_id = sp.compute(group.item_id)
+        # store in to the market database, relisting takes a new snapshot
+        self.data.ticket_items[sp.pair(params.group_id, item_id)] = sp.record(
+            id=item_id,
+            fa2=self.fa2_override(params.address),
+            token_id=params.token_id,
+            seller=sp.sender,
+            buyer=sp.none,
+            price=params.price,
+            state=TicketItemState.CREATED.value,
+            royalties=self.token_royalty_shares(params.address, params.token_id, MAX_ROYALTIES)
+        )
+        # update the user record
+        self.add_indexed_item(
+            self.data.listed_items,
+            self.data.listed_item_indexes,
+            self.data.listed_item_counts,
+            sp.pair(params.group_id, sp.sender),
+            item_id)
+        # increase the item id
+        group.item_id += 1
+
+    @sp.entry_point
+    def delete_ticket_item(self, params):
+        """
+        make the item inactive
+        """
+        sp.set_type(params, sp.TRecord(group_id=sp.TNat, item_id=sp.TNat))
+        key = sp.compute(sp.pair(params.group_id, params.item_id))
+        sp.verify(self.data.ticket_items.contains(key), "item is not exists")
+        item = self.data.ticket_items[key]
+        sp.verify(sp.sender == item.seller, "only the seller can delete an item")
+        with sp.if_(item.state == TicketItemState.CREATED.value):
+            item.state = TicketItemState.INACTIVE.value
+            self.remove_indexed_item(
+                self.data.listed_items,
+                self.data.listed_item_indexes,
+                self.data.listed_item_counts,
+                sp.pair(params.group_id, item.seller),
+                params.item_id)
+
+    @sp.entry_point
+    def collect(self, params):
+        """Collects a token listed in a group.
+
+        The price is credited to the royalty recipients, the fee recipient,
+        the group address and the seller.
+        """
+        sp.set_type(params, sp.TRecord(group_id=sp.TNat, item_id=sp.TNat))
+
+        # Check that collects are not paused
+        sp.verify(~self.data.collects_paused, message="MP_COLLECTS_PAUSED")
+
+        group = self.get_group(params.group_id)
+        sp.verify(sp.now < group.timeend, "group is closed")
+
+        key = sp.compute(sp.pair(params.group_id, params.item_id))
+        sp.verify(self.data.ticket_items.contains(key), message="MP_WRONG_ITEM_ID")
+        item = self.data.ticket_items[key]
+        sp.verify(item.state == TicketItemState.CREATED.value, message="MP_ITEM_NOT_ON_SALE")
+
+        # Check that the collector is not the seller of the item
+        sp.verify(sp.sender != item.seller, message="MP_IS_ITEM_SELLER")
+
+        # Check that the provided mutez amount is exactly the item price
+        sp.verify(sp.amount == item.price, message="MP_WRONG_TEZ_AMOUNT")
+
+        # Get the royalty shares resolved when the token was listed
+        royalties = sp.local("royalties", item.royalties)
+
+        # Credit the royalties to the token minter
+        minter_royalties_amount = sp.local(
+            "minter_royalties_amount", sp.split_tokens(
+                sp.amount, royalties.value.minter_share, 1000))
+
+        self.credit(royalties.value.minter, minter_royalties_amount.value)
+
+        # Credit the royalties to the token creator
+        creator_royalties_amount = sp.local(
+            "creator_royalties_amount", sp.split_tokens(
+                sp.amount, royalties.value.creator_share, 1000))
+
+        self.credit(royalties.value.creator, creator_royalties_amount.value)
+
+        # Credit the management fees
+        fee_amount = sp.local(
+            "fee_amount", sp.split_tokens(sp.amount, self.data.fee, 1000))
+
+        self.credit(self.data.fee_recipient, fee_amount.value)
+
+        # Credit the group revenue share
+        revenue_amount = sp.local(
+            "revenue_amount", sp.split_tokens(sp.amount, group.revenue, 1000))
+
+        self.credit(group.groupaddress, revenue_amount.value)
+
+        # Credit what is left to the seller
+        self.credit(item.seller,
+                    sp.amount -
+                    minter_royalties_amount.value -
+                    creator_royalties_amount.value -
+                    fee_amount.value -
+                    revenue_amount.value)
+
+        # Transfer the token to the collector
+        self.fa2_transfer(
+            fa2=self.ticket_item_fa2(item),
+            from_=item.seller,
+            to_=sp.sender,
+            token_id=item.token_id,
+            token_amount=1)
+
+        # update the listed and purchase lists
+        self.remove_indexed_item(
+            self.data.listed_items,
+            self.data.listed_item_indexes,
+            self.data.listed_item_counts,
+            sp.pair(params.group_id, item.seller),
+            params.item_id)
+        self.add_indexed_item(
+            self.data.user_items,
+            self.data.user_item_indexes,
+            self.data.user_item_counts,
+            sp.pair(params.group_id, sp.sender),
+            params.item_id)
+
+        # update the item state
+        item.buyer = sp.some(sp.sender)
+        item.state = TicketItemState.SOLD.value
+
+    @sp.entry_point
+    def withdraw(self):
+        """Sends the whole credited balance of the sender to the sender.
+        """
+        # Check that no tez have been transferred
+        self.check_no_tez_transfer()
+
+        # Check that the sender has something to withdraw
+        amount = sp.compute(self.data.balances.get_opt(sp.sender).open_some(
+            "MP_NO_BALANCE"))
+
+        # Reset the balance before sending it
+        del self.data.balances[sp.sender]
+        sp.send(sp.sender, amount)
+
+    @sp.entry_point
+    def update_fee(self, new_fee):
+        """Updates the GroupRegistry management fees.
+        """
+        # Define the input parameter data type
+        sp.set_type(new_fee, sp.TNat)
+
+        # Check that the administrator executed the entry point
+        self.check_is_administrator()
+
+        # Check that no tez have been transferred
+        self.check_no_tez_transfer()
+
+        # Check that the new fee is not larger than 25%
+        sp.verify(new_fee <= market.MAX_FEE, message="MP_WRONG_FEES")
+
+        # Set the new management fee
+        self.data.fee = new_fee
+
+    @sp.entry_point
+    def update_fee_recipient(self, new_fee_recipient):
+        """Updates the GroupRegistry management fee recipient address.
+        """
+        # Define the input parameter data type
+        sp.set_type(new_fee_recipient, sp.TAddress)
+
+        # Check that the administrator executed the entry point
+        self.check_is_administrator()
+
+        # Check that no tez have been transferred
+        self.check_no_tez_transfer()
+
+        # Set the new management fee recipient address
+        self.data.fee_recipient = new_fee_recipient
+
+    @sp.entry_point
+    def transfer_administrator(self, proposed_administrator):
+        """Proposes to transfer the contracts administrator to another address.
+        """
+        # Define the input parameter data type
+        sp.set_type(proposed_administrator, sp.TAddress)
+
+        # Check that the administrator executed the entry point
+        self.check_is_administrator()
+
+        # Check that no tez have been transferred
+        self.check_no_tez_transfer()
+
+        # Set the new proposed administrator address
+        self.data.proposed_administrator = sp.some(proposed_administrator)
+
+    @sp.entry_point
+    def accept_administrator(self):
+        """The proposed administrator accepts the contracts administrator
+        responsabilities.
+        """
+        # Check that there is a proposed administrator
+        sp.verify(self.data.proposed_administrator.is_some(),
+                  message="MP_NO_NEW_ADMIN")
+
+        # Check that the proposed administrator executed the entry point
+        sp.verify(sp.sender == self.data.proposed_administrator.open_some(),
+                  message="MP_NOT_PROPOSED_ADMIN")
+
+        # Check that no tez have been transferred
+        self.check_no_tez_transfer()
+
+        # Set the new administrator address
+        self.data.administrator = sp.sender
+
+        # Reset the proposed administrator value
+        self.data.proposed_administrator = sp.none
+
+    @sp.entry_point
+    def set_pause_collects(self, pause):
+        """Pause or not the collects.
+        """
+        # Define the input parameter data type
+        sp.set_type(pause, sp.TBool)
+
+        # Check that the administrator executed the entry point
+        self.check_is_administrator()
+
+        # Check that no tez have been transferred
+        self.check_no_tez_transfer()
+
+        # Pause or unpause the collects
+        self.data.collects_paused = pause
+
+    @sp.onchain_view()
+    def get_administrator(self):
+        """Returns the GroupRegistry administrator address.
+        """
+        sp.result(self.data.administrator)
+
+    @sp.onchain_view()
+    def get_group_info(self, group_id):
+        """Returns the record of a group.
+        """
+        sp.set_type(group_id, sp.TNat)
+        sp.result(self.data.groups.get_opt(group_id).open_some("MP_WRONG_GROUP_ID"))
+
+    @sp.onchain_view()
+    def get_user_items(self, params):
+        """Returns a page of the item ids collected by a user in a group.
+        """
+        sp.set_type(params, t_items_page_params)
+        sp.result(self.indexed_items_page(
+            self.data.user_items,
+            self.data.user_item_counts,
+            sp.pair(params.group_id, params.owner),
+            params.offset,
+            params.limit))
+
+    @sp.onchain_view()
+    def get_listed_items(self, params):
+        """Returns a page of the item ids listed by a user in a group.
+        """
+        sp.set_type(params, t_items_page_params)
+        sp.result(self.indexed_items_page(
+            self.data.listed_items,
+            self.data.listed_item_counts,
+            sp.pair(params.group_id, params.owner),
+            params.offset,
+            params.limit))
+
+    @sp.onchain_view()
+    def get_balance(self, address):
+        """Returns the mutez credited to an address and not withdrawn yet.
+        """
+        sp.set_type(address, sp.TAddress)
+        sp.result(self.data.balances.get(address, sp.mutez(0)))
+
+
+@sp.add_test(name="group registry")
+def test():
+    scenario = sp.test_scenario()
+    nft_module = sp.io.import_script_from_url("file:contracts/NFT.py")
+
+    # Test address
+    admin = sp.test_account("admin")
+    alice = sp.test_account("alice")
+    bob = sp.test_account("bob")
+    group_address = sp.test_account("group")
+
+    # Create the ticket NFT and the registry contracts
+    fa2 = nft_module.NFT(
+        administrator=admin.address,
+        metadata=sp.utils.metadata_of_url("ipfs://aaa"),
+    )
+    scenario += fa2
+    registry = GroupRegistry(
+        administrator=admin.address,
+        metadata=sp.utils.metadata_of_url("ipfs://aaa"),
+        fa2=fa2.address,
+        fee=sp.nat(25),
+    )
+    scenario += registry
+
+    scenario.h2("Create two groups")
+    registry.create_group(
+        groupaddress=group_address.address, threshold=0, royalty=0, revenue=251,
+        timeend=10000).run(sender=alice, valid=False, exception="MP_WRONG_REVENUE")
+    for _ in range(2):
+        registry.create_group(
+            groupaddress=group_address.address, threshold=0, royalty=0, revenue=100,
+            timeend=10000).run(sender=alice, now=sp.timestamp(0))
+    scenario.verify(registry.data.group_id == 2)
+
+    scenario.h2("List and collect a token in the second group")
+    fa2.mint([sp.record(metadata=sp.map({"": sp.bytes("0x00")}), to_=alice.address)]).run(sender=admin)
+    fa2.update_operators([sp.variant("add_operator", sp.record(
+        owner=alice.address, operator=registry.address, token_id=0))]).run(sender=alice)
+    registry.list_ticket(group_id=2, address=fa2.address, token_id=0, price=sp.tez(1)).run(
+        sender=alice, now=sp.timestamp(10), valid=False, exception="MP_WRONG_GROUP_ID")
+    registry.list_ticket(group_id=1, address=fa2.address, token_id=0, price=sp.tez(1)).run(
+        sender=alice, amount=sp.mutez(1), now=sp.timestamp(10), valid=False, exception="MP_TEZ_TRANSFER")
+    registry.list_ticket(group_id=1, address=fa2.address, token_id=0, price=sp.tez(1)).run(
+        sender=alice, now=sp.timestamp(10))
+    scenario.verify(registry.data.ticket_items[sp.pair(1, 0)].royalties.minter_share == 0)
+    scenario.verify(registry.get_listed_items(
+        sp.record(group_id=1, owner=alice.address, offset=0, limit=10)) == sp.list([0]))
+    scenario.verify(registry.get_listed_items(
+        sp.record(group_id=0, owner=alice.address, offset=0, limit=10)) == sp.list([]))
+    registry.collect(group_id=0, item_id=0).run(
+        sender=bob, amount=sp.tez(1), now=sp.timestamp(20), valid=False, exception="MP_WRONG_ITEM_ID")
+    registry.collect(group_id=1, item_id=0).run(
+        sender=bob, amount=sp.tez(1), now=sp.timestamp(20000), valid=False, exception="group is closed")
+    registry.collect(group_id=1, item_id=0).run(sender=bob, amount=sp.tez(1), now=sp.timestamp(20))
+    scenario.verify(fa2.data.ledger[0] == bob.address)
+    scenario.verify(registry.get_balance(admin.address) == sp.mutez(25000))
+    scenario.verify(registry.get_balance(group_address.address) == sp.mutez(100000))
+    scenario.verify(registry.get_balance(alice.address) == sp.mutez(875000))
+    scenario.verify(registry.get_user_items(
+        sp.record(group_id=1, owner=bob.address, offset=0, limit=10)) == sp.list([0]))
+    scenario.verify(registry.get_listed_items(
+        sp.record(group_id=1, owner=alice.address, offset=0, limit=10)) == sp.list([]))
+
+    scenario.h2("Withdraw the credited balances")
+    registry.withdraw().run(sender=alice)
+    registry.withdraw().run(sender=alice, valid=False, exception="MP_NO_BALANCE")
+
+    scenario.h2("Royalty shares are bounded when a token is listed")
+    high_royalties = market.RoyaltiesTestFA2(
+        minter=admin.address, creator=admin.address, share=sp.nat(300))
+    scenario += high_royalties
+    low_royalties = market.RoyaltiesTestFA2(
+        minter=admin.address, creator=admin.address, share=sp.nat(100))
+    scenario += low_royalties
+    registry.list_ticket(group_id=0, address=high_royalties.address, token_id=0, price=sp.tez(1)).run(
+        sender=alice, now=sp.timestamp(10), valid=False, exception="MP_WRONG_ROYALTIES")
+    registry.list_ticket(group_id=0, address=low_royalties.address, token_id=0, price=sp.tez(1)).run(
+        sender=alice, now=sp.timestamp(10))
+    scenario.verify(registry.data.ticket_items[sp.pair(0, 0)].royalties.creator_share == 100)
+    scenario.verify(registry.data.ticket_items[sp.pair(0, 0)].fa2 == sp.some(low_royalties.address))
+
+
+sp.add_compilation_target("GroupRegistry", GroupRegistry(
+    administrator=sp.address("tz1KozzwY6LrGDsZkTPLGwbh13HNezL21JMV"),
+    metadata=sp.utils.metadata_of_url("ipfs://aaa"),
+    fa2=sp.address("tz1KozzwY6LrGDsZkTPLGwbh13HNezL21JMV"),
+    fee=sp.nat(25),
+    ))
@@ -1,8 +1,57 @@
+import hashlib
+import sys
 from enum import Enum
 
 import smartpy as sp
 
-FA2 = sp.io.import_script_from_url("https://smartpy.io/templates/fa2_lib.py")
+# Local fork of https://smartpy.io/templates/fa2_lib.py with the following
+# additions: fused definedness and ownership checks in Fa2Nft transfer and
+# burn, operators for all, aggregated Fa2Fungible transfers, edition series
+# and paginated burn-aware token views. It is pinned by its sha256,
+# FA2_LIB_SHA256 must be updated on every edit of fa2.py.
+FA2_LIB_PATH = "contracts/fa2.py"
+FA2_LIB_SHA256 = "aa103b61e6349fba5d4f370f6afe10621e05c2a5810033b198e741991cf45a47"
+
+
+def import_fa2():
+    """Import the pinned FA2 library, reusing the module if it was already
+    loaded by this process."""
+    key = "fa2_lib:" + FA2_LIB_SHA256
+    if key not in sys.modules:
+        with open(FA2_LIB_PATH, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        if digest != FA2_LIB_SHA256:
+            raise Exception(
+                "%s doesn't match the pinned FA2 library sha256" % FA2_LIB_PATH
+            )
+        # Named like the upstream template so that the library tests aren't
+        # added to the importing scenario.
+        sys.modules[key] = sp.io.import_script_from_url(
+            "file:" + FA2_LIB_PATH, name="templates/fa2_lib.py"
+        )
+    return sys.modules[key]
+
+
+FA2 = import_fa2()
+
+
+t_mint_batch = sp.TList(
+    sp.TRecord(to_=sp.TAddress, metadata=sp.TMap(sp.TString, sp.TBytes))
+)
+
+t_token_status_batch = sp.TList(sp.TRecord(token_id=sp.TNat, status=sp.TNat))
+
+# One bitfield per status for a word of STATUS_WORD_BITS consecutive token ids
+t_status_word = sp.TRecord(claimed=sp.TNat, void=sp.TNat).layout(("claimed", "void"))
+
+STATUS_WORD_BITS = 256
+
+EMPTY_STATUS_WORD = sp.record(claimed=sp.nat(0), void=sp.nat(0))
+
+
+def clear_bits(value, mask):
+    """Return `value` with the bits of `mask` set to 0."""
+    return sp.as_nat(value - (value & mask))
 
 
 class NFTStatus(Enum):
@@ -14,16 +63,27 @@ class NFTStatus(Enum):
 class NFT(
     FA2.Admin,
     FA2.OffchainviewTokenMetadata,
+    FA2.OnchainviewBalanceOf,
     FA2.MintNft,
+    FA2.BurnNft,
     FA2.Fa2Nft,
 ):
-    def __init__(self, administrator, **kwargs):
+    def __init__(self, administrator, status_bitmap=False, **kwargs):
+        """If `status_bitmap` is True the token status is packed in bitmaps of
+        STATUS_WORD_BITS token ids per `token_status` entry."""
         FA2.Fa2Nft.__init__(self, **kwargs)
         FA2.Admin.__init__(self, administrator)
-        self.update_initial_storage(
-            # The big map with the token's status
-            token_status=sp.big_map({}, tkey=sp.TNat, tvalue=sp.TNat),
-        )
+        self.status_bitmap = status_bitmap
+        if status_bitmap:
+            self.update_initial_storage(
+                # The big map with the packed token's status, keyed by word index
+                token_status=sp.big_map({}, tkey=sp.TNat, tvalue=t_status_word),
+            )
+        else:
+            self.update_initial_storage(
+                # The big map with the token's status, a missing entry means MINTED
+                token_status=sp.big_map({}, tkey=sp.TNat, tvalue=sp.TNat),
+            )
 
     @sp.entry_point
     def mint(self, batch):
@@ -34,15 +94,149 @@ class NFT(
             metadata = sp.record(token_id=token_id, token_info=action.metadata)
             self.data.token_metadata[token_id] = metadata
             self.data.ledger[token_id] = action.to_
-            self.data.token_status[token_id] = NFTStatus.MINTED.value
             self.data.last_token_id += 1
 
+    @sp.entry_point
+    def mint_bulk(self, batch):
+        """Admin can mint a batch of new tokens in one contiguous id range.
+
+        The range is reserved with a single `last_token_id` update and only
+        the `token_metadata` and `ledger` entries are written. A token without
+        a `token_status` entry is MINTED.
+        """
+        sp.set_type(batch, t_mint_batch)
+        sp.verify(self.is_administrator(sp.sender), "FA2_NOT_ADMIN")
+        first_token_id = sp.compute(self.data.last_token_id)
+        self.data.last_token_id = first_token_id + sp.len(batch)
+        token_id = sp.local("token_id", first_token_id)
+        with sp.for_("action", batch) as action:
+            self.data.token_metadata[token_id.value] = sp.record(
+                token_id=token_id.value, token_info=action.metadata
+            )
+            self.data.ledger[token_id.value] = action.to_
+            token_id.value += 1
+
+    @sp.entry_point
+    def set_token_status(self, batch):
+        """Admin can move tokens to the CLAIMED or VOID status.
+
+        Only the transitions are stored: setting a token back to MINTED
+        removes its `token_status` entry.
+        """
+        sp.set_type(batch, t_token_status_batch)
+        sp.verify(self.is_administrator(sp.sender), "FA2_NOT_ADMIN")
+        with sp.for_("action", batch) as action:
+            sp.verify(self.is_defined(action.token_id), "FA2_TOKEN_UNDEFINED")
+            sp.verify(
+                (action.status == NFTStatus.MINTED.value)
+                | (action.status == NFTStatus.CLAIMED.value)
+                | (action.status == NFTStatus.VOID.value),
+                "NFT_INVALID_STATUS",
+            )
+            self.set_token_status_(action.token_id, action.status)
+
+    @sp.entry_point
+    def claim(self, token_ids):
+        """Admin can mark a batch of MINTED tokens as CLAIMED.
+
+        With `status_bitmap`, consecutive ids sharing a word are updated with
+        one `token_status` read and one write.
+        """
+        sp.set_type(token_ids, sp.TList(sp.TNat))
+        sp.verify(self.is_administrator(sp.sender), "FA2_NOT_ADMIN")
+        if self.status_bitmap:
+            word_index = sp.local("word_index", sp.none, sp.TOption(sp.TNat))
+            word = sp.local("word", EMPTY_STATUS_WORD, t_status_word)
+            with sp.for_("token_id", token_ids) as token_id:
+                sp.verify(self.is_defined(token_id), "FA2_TOKEN_UNDEFINED")
+                index = sp.compute(token_id // STATUS_WORD_BITS)
+                with sp.if_(word_index.value != sp.some(index)):
+                    with sp.if_(word_index.value.is_some()):
+                        self.data.token_status[word_index.value.open_some()] = word.value
+                    word.value = self.data.token_status.get(index, EMPTY_STATUS_WORD)
+                    word_index.value = sp.some(index)
+                mask = sp.compute(sp.nat(1) << (token_id % STATUS_WORD_BITS))
+                sp.verify((word.value.void & mask) == 0, "NFT_TOKEN_VOID")
+                word.value.claimed = word.value.claimed | mask
+            with sp.if_(word_index.value.is_some()):
+                self.data.token_status[word_index.value.open_some()] = word.value
+        else:
+            with sp.for_("token_id", token_ids) as token_id:
+                sp.verify(self.is_defined(token_id), "FA2_TOKEN_UNDEFINED")
+                sp.verify(
+                    self.token_status_(token_id) != NFTStatus.VOID.value,
+                    "NFT_TOKEN_VOID",
+                )
+                self.data.token_status[token_id] = NFTStatus.CLAIMED.value
+
+    def set_token_status_(self, token_id, status):
+        """Store the status of a token, removing the entry when it's MINTED."""
+        if self.status_bitmap:
+            index = sp.compute(token_id // STATUS_WORD_BITS)
+            mask = sp.compute(sp.nat(1) << (token_id % STATUS_WORD_BITS))
+            word = sp.compute(self.data.token_status.get(index, EMPTY_STATUS_WORD))
+            claimed = sp.compute(
+                sp.eif(
+                    status == NFTStatus.CLAIMED.value,
+                    word.claimed | mask,
+                    clear_bits(word.claimed, mask),
+                )
+            )
+            void = sp.compute(
+                sp.eif(
+                    status == NFTStatus.VOID.value,
+                    word.void | mask,
+                    clear_bits(word.void, mask),
+                )
+            )
+            with sp.if_((claimed == 0) & (void == 0)):
+                del self.data.token_status[index]
+            with sp.else_():
+                self.data.token_status[index] = sp.record(claimed=claimed, void=void)
+        else:
+            with sp.if_(status == NFTStatus.MINTED.value):
+                del self.data.token_status[token_id]
+            with sp.else_():
+                self.data.token_status[token_id] = status
+
+    def token_status_(self, token_id):
+        """Return the status of a token, MINTED when no entry is stored."""
+        if self.status_bitmap:
+            word = sp.compute(
+                self.data.token_status.get(
+                    token_id // STATUS_WORD_BITS, EMPTY_STATUS_WORD
+                )
+            )
+            mask = sp.compute(sp.nat(1) << (token_id % STATUS_WORD_BITS))
+            return sp.eif(
+                (word.claimed & mask) != 0,
+                NFTStatus.CLAIMED.value,
+                sp.eif(
+                    (word.void & mask) != 0,
+                    NFTStatus.VOID.value,
+                    NFTStatus.MINTED.value,
+                ),
+            )
+        return self.data.token_status.get(token_id, NFTStatus.MINTED.value)
+
     @sp.onchain_view(pure=True)
     def is_claimed(self, token_id):
         """If the token has been claimed yet"""
         sp.set_type(token_id, sp.TNat)
-        self.is_defined(token_id)
-        sp.result(self.data.token_status[token_id] == NFTStatus.CLAIMED.value)
+        sp.verify(self.is_defined(token_id), "FA2_TOKEN_UNDEFINED")
+        sp.result(self.token_status_(token_id) == NFTStatus.CLAIMED.value)
+
+    @sp.onchain_view(pure=True)
+    def get_token_status(self, token_id):
+        """Return the status of the token (MINTED, CLAIMED or VOID)"""
+        sp.set_type(token_id, sp.TNat)
+        sp.verify(self.is_defined(token_id), "FA2_TOKEN_UNDEFINED")
+        sp.result(self.token_status_(token_id))
+
+    @sp.onchain_view(pure=True)
+    def get_next_token_id(self):
+        """Return the id of the next minted token"""
+        sp.result(self.data.last_token_id)
 
 
 sp.add_compilation_target(
@@ -0,0 +1,58 @@
+import smartpy as sp
+
+nft_module = sp.io.import_script_from_url("file:contracts/NFT.py")
+
+# Batch sizes at which `mint` and `mint_bulk` are run side by side. The
+# scenario checks that both write the same tokens, it doesn't measure gas:
+# the interpreter reports none, and the two entrypoints only differ in how
+# often `last_token_id` is updated.
+BATCH_SIZES = [1, 10, 100, 500]
+
+
+def make_metadata(symbol, name):
+    """Helper function to build metadata JSON bytes values."""
+    return sp.map(
+        l={
+            "name": sp.utils.bytes_of_string(name),
+            "symbol": sp.utils.bytes_of_string(symbol),
+        }
+    )
+
+
+def add_mint_benchmark(batch_size):
+    @sp.add_test(name="Bench Mint %d" % batch_size)
+    def bench_mint():
+        scenario = sp.test_scenario()
+        admin = sp.test_account("admin")
+        user1 = sp.test_account("user1")
+        tok_md = make_metadata(name="Cowboys SZN22", symbol="CBY22")
+        batch = [sp.record(metadata=tok_md, to_=user1.address)] * batch_size
+
+        scenario.h2("Mint %d tokens" % batch_size)
+        fa2 = nft_module.NFT(
+            administrator=admin.address,
+            metadata=sp.utils.metadata_of_url("ipfs://aaa"),
+        )
+        scenario += fa2
+        fa2.mint(batch).run(sender=admin)
+        scenario.verify(fa2.data.last_token_id == batch_size)
+
+        scenario.h2("Bulk mint %d tokens" % batch_size)
+        fa2_bulk = nft_module.NFT(
+            administrator=admin.address,
+            metadata=sp.utils.metadata_of_url("ipfs://aaa"),
+        )
+        scenario += fa2_bulk
+        fa2_bulk.mint_bulk(batch).run(sender=admin)
+        scenario.verify(fa2_bulk.data.last_token_id == batch_size)
+
+        scenario.h2("Both mints write the same tokens")
+        for token_id in [0, batch_size - 1]:
+            scenario.verify(fa2_bulk.data.ledger[token_id] == fa2.data.ledger[token_id])
+            scenario.verify(
+                fa2_bulk.data.token_metadata[token_id] == fa2.data.token_metadata[token_id]
+            )
+
+
+for batch_size in BATCH_SIZES:
+    add_mint_benchmark(batch_size)
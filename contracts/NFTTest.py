@@ -1,6 +1,7 @@
 import smartpy as sp
 
-nft_module = sp.io.import_script_from_url("file:contracts/nft.py")
+nft_module = sp.io.import_script_from_url("file:contracts/NFT.py")
+NFTStatus = nft_module.NFTStatus
 
 
 def make_metadata(symbol, name):
@@ -13,7 +14,7 @@ def make_metadata(symbol, name):
     )
 
 
-def get_test_environment():
+def get_test_environment(status_bitmap=False):
     # Initialize the test scenario
     scenario = sp.test_scenario()
 
@@ -27,6 +28,7 @@ def get_test_environment():
     fa2 = nft_module.NFT(
         administrator=admin.address,
         metadata=sp.utils.metadata_of_url("ipfs://aaa"),
+        status_bitmap=status_bitmap,
     )
     scenario += fa2
 
@@ -65,4 +67,135 @@ def test_mint_nft():
     scenario.verify(sp.len(fa2.all_tokens()) == 1)
     scenario.verify(fa2.token_metadata(0).token_info["name"] == tok0_md["name"])
     scenario.verify(fa2.token_metadata(0).token_info["symbol"] == tok0_md["symbol"])
-    scenario.verify(~fa2.is_claimed(0))
\ No newline at end of file
+    scenario.verify(~fa2.is_claimed(0))
+
+
+@sp.add_test(name="Test Mint Bulk")
+def test_mint_bulk_nft():
+    test_env = get_test_environment()
+    scenario = test_env["scenario"]
+    admin = test_env["admin"]
+    user1 = test_env["user1"]
+    user2 = test_env["user2"]
+    fa2 = test_env["fa2"]
+
+    tok0_md = make_metadata(name="Cowboys SZN22", symbol="CBY22")
+
+    scenario.h3("Bulk mint from non-admin account")
+    fa2.mint_bulk([sp.record(metadata=tok0_md, to_=user1.address)]).run(
+        sender=user1, valid=False, exception="FA2_NOT_ADMIN"
+    )
+
+    scenario.h3("Bulk mint after a regular mint")
+    fa2.mint([sp.record(metadata=tok0_md, to_=user1.address)]).run(sender=admin)
+    fa2.mint_bulk(
+        [
+            sp.record(metadata=tok0_md, to_=user1.address),
+            sp.record(metadata=tok0_md, to_=user2.address),
+        ]
+    ).run(sender=admin)
+
+    scenario.verify(fa2.data.last_token_id == 3)
+    scenario.verify(fa2.get_balance(sp.record(owner=user1.address, token_id=1)) == 1)
+    scenario.verify(fa2.get_balance(sp.record(owner=user2.address, token_id=2)) == 1)
+    scenario.verify(fa2.token_metadata(2).token_id == 2)
+    scenario.verify(~fa2.data.token_status.contains(2))
+    scenario.verify(~fa2.is_claimed(2))
+
+
+@sp.add_test(name="Test Token Status")
+def test_token_status_nft():
+    test_env = get_test_environment()
+    scenario = test_env["scenario"]
+    admin = test_env["admin"]
+    user1 = test_env["user1"]
+    fa2 = test_env["fa2"]
+
+    tok0_md = make_metadata(name="Cowboys SZN22", symbol="CBY22")
+    fa2.mint(
+        [
+            sp.record(metadata=tok0_md, to_=user1.address),
+            sp.record(metadata=tok0_md, to_=user1.address),
+        ]
+    ).run(sender=admin)
+
+    scenario.h3("Minted tokens have no status entry")
+    scenario.verify(~fa2.data.token_status.contains(0))
+    scenario.verify(fa2.get_token_status(0) == NFTStatus.MINTED.value)
+
+    scenario.h3("Status update from non-admin account")
+    fa2.set_token_status(
+        [sp.record(token_id=0, status=NFTStatus.CLAIMED.value)]
+    ).run(sender=user1, valid=False, exception="FA2_NOT_ADMIN")
+
+    scenario.h3("Claim and void tokens")
+    fa2.set_token_status(
+        [
+            sp.record(token_id=0, status=NFTStatus.CLAIMED.value),
+            sp.record(token_id=1, status=NFTStatus.VOID.value),
+        ]
+    ).run(sender=admin)
+    scenario.verify(fa2.is_claimed(0))
+    scenario.verify(~fa2.is_claimed(1))
+    scenario.verify(fa2.get_token_status(1) == NFTStatus.VOID.value)
+
+    scenario.h3("Back to MINTED removes the entry")
+    fa2.set_token_status(
+        [sp.record(token_id=0, status=NFTStatus.MINTED.value)]
+    ).run(sender=admin)
+    scenario.verify(~fa2.data.token_status.contains(0))
+    scenario.verify(~fa2.is_claimed(0))
+
+    scenario.h3("Unknown status and token")
+    fa2.set_token_status([sp.record(token_id=0, status=7)]).run(
+        sender=admin, valid=False, exception="NFT_INVALID_STATUS"
+    )
+    fa2.set_token_status(
+        [sp.record(token_id=5, status=NFTStatus.CLAIMED.value)]
+    ).run(sender=admin, valid=False, exception="FA2_TOKEN_UNDEFINED")
+
+
+@sp.add_test(name="Test Claim Bitmap")
+def test_claim_bitmap_nft():
+    test_env = get_test_environment(status_bitmap=True)
+    scenario = test_env["scenario"]
+    admin = test_env["admin"]
+    user1 = test_env["user1"]
+    fa2 = test_env["fa2"]
+
+    tok0_md = make_metadata(name="Cowboys SZN22", symbol="CBY22")
+    fa2.mint_bulk([sp.record(metadata=tok0_md, to_=user1.address)] * 260).run(
+        sender=admin
+    )
+
+    scenario.h3("Claim from non-admin account")
+    fa2.claim([0]).run(sender=user1, valid=False, exception="FA2_NOT_ADMIN")
+
+    scenario.h3("Claim across two status words")
+    fa2.claim([0, 1, 255, 256, 259]).run(sender=admin)
+    scenario.verify(fa2.is_claimed(0))
+    scenario.verify(fa2.is_claimed(255))
+    scenario.verify(fa2.is_claimed(256))
+    scenario.verify(fa2.is_claimed(259))
+    scenario.verify(~fa2.is_claimed(2))
+    scenario.verify(fa2.data.token_status.contains(0))
+    scenario.verify(fa2.data.token_status.contains(1))
+    scenario.verify(~fa2.data.token_status.contains(2))
+    scenario.verify(fa2.data.token_status[1].claimed == (1 << 0) + (1 << 3))
+
+    scenario.h3("Void tokens can't be claimed")
+    fa2.set_token_status([sp.record(token_id=2, status=NFTStatus.VOID.value)]).run(
+        sender=admin
+    )
+    scenario.verify(fa2.get_token_status(2) == NFTStatus.VOID.value)
+    fa2.claim([3, 2]).run(sender=admin, valid=False, exception="NFT_TOKEN_VOID")
+
+    scenario.h3("Back to MINTED clears the bits")
+    fa2.set_token_status(
+        [
+            sp.record(token_id=256, status=NFTStatus.MINTED.value),
+            sp.record(token_id=259, status=NFTStatus.MINTED.value),
+        ]
+    ).run(sender=admin)
+    scenario.verify(~fa2.data.token_status.contains(1))
+    scenario.verify(fa2.get_token_status(256) == NFTStatus.MINTED.value)
\ No newline at end of file
@@ -3,26 +3,63 @@ import smartpy as sp
 # FA2 standard: https://gitlab.com/tezos/tzip/-/blob/master/proposals/tzip-12/tzip-12.md
 # Documentation: https://smartpy.io/docs/guides/FA/FA2
 
+t_balance_of_request = sp.TRecord(owner=sp.TAddress, token_id=sp.TNat)
+
+t_balance_of_response = sp.TRecord(
+    request=t_balance_of_request, balance=sp.TNat
+).layout(("request", "balance"))
+
 t_balance_of_args = sp.TRecord(
-    requests=sp.TList(sp.TRecord(owner=sp.TAddress, token_id=sp.TNat)),
-    callback=sp.TContract(
-        sp.TList(
-            sp.TRecord(
-                request=sp.TRecord(owner=sp.TAddress, token_id=sp.TNat), balance=sp.TNat
-            ).layout(("request", "balance"))
-        )
-    ),
+    requests=sp.TList(t_balance_of_request),
+    callback=sp.TContract(sp.TList(t_balance_of_response)),
 ).layout(("requests", "callback"))
 
+# Bytes of the decimal digits 0 to 9
+DIGITS = sp.bytes("0x30313233343536373839")
+
+
+def nat_to_bytes(n):
+    """Return the decimal representation of `n` as bytes."""
+    digits = sp.local("digits", sp.list([], t=sp.TBytes))
+    value = sp.local("value", n)
+    digits.value.push(sp.slice(DIGITS, value.value % 10, 1).open_some())
+    value.value = value.value // 10
+    with sp.while_(value.value > 0):
+        digits.value.push(sp.slice(DIGITS, value.value % 10, 1).open_some())
+        value.value = value.value // 10
+    return sp.concat(digits.value)
+
+
+# Number of reward claims tracked by each `claimed_rewards` entry
+CLAIMED_WORD_BITS = 256
+
+
+def hash_pair(a, b):
+    """Return the Merkle tree node of two sibling hashes, sorted so that proofs
+    don't need the position of each sibling."""
+    return sp.eif(
+        a < b, sp.sha256(sp.concat([a, b])), sp.sha256(sp.concat([b, a]))
+    )
+
+
+def reward_leaf(index, owner):
+    """Return the Merkle tree leaf of the reward `index` of an epoch."""
+    return sp.sha256(
+        sp.pack(sp.record(index=index, owner=owner).layout(("index", "owner")))
+    )
+
 
 class Reward(sp.Contract):
     """A class Reward contracts for FatCowIO Trading Protocol "
     """
 
-    def __init__(self, administrator, creator, metadata_base, metadata_url, fa2):
+    def __init__(
+        self, administrator, creator, metadata_base, metadata_url, fa2, base_uri=""
+    ):
         self.init(
             administrator=administrator,
             creator=creator,
+            base_uri=sp.utils.bytes_of_string(base_uri),
             ledger=sp.big_map(tkey=sp.TNat, tvalue=sp.TAddress),
             metadata=sp.utils.metadata_of_url(metadata_url),
             next_token_id=sp.nat(0),
@@ -44,11 +81,19 @@ class Reward(sp.Contract):
             paused=False,
             proposed_administrator=sp.none,
             fa2=fa2,
+            next_epoch_id=sp.nat(0),
+            reward_epochs=sp.big_map(tkey=sp.TNat, tvalue=sp.TBytes),
+            claimed_rewards=sp.big_map(
+                tkey=sp.TPair(sp.TNat, sp.TNat), tvalue=sp.TNat
+            ),
         )
         metadata_base["views"] = [
             self.all_tokens,
+            self.all_tokens_page,
             self.get_balance,
             self.is_operator,
+            self.token_metadata,
+            self.tokens_of_owner,
             self.total_supply,
         ]
         self.init_metadata("metadata_base", metadata_base)
@@ -67,32 +112,41 @@ class Reward(sp.Contract):
             `FA2_TOKEN_UNDEFINED`, `FA2_NOT_OPERATOR`, `FA2_INSUFFICIENT_BALANCE`
         """
         with sp.for_("transfer", batch) as transfer:
-            with sp.for_("tx", transfer.txs) as tx:
-                sp.set_type(
-                    tx,
-                    sp.TRecord(
-                        to_=sp.TAddress, token_id=sp.TNat, amount=sp.TNat
-                    ).layout(("to_", ("token_id", "amount"))),
-                )
-                sp.verify(tx.token_id < self.data.next_token_id, "FA2_TOKEN_UNDEFINED")
-                sp.verify(
-                    (transfer.from_ == sp.sender)
-                    | self.data.operators.contains(
-                        sp.record(
-                            owner=transfer.from_,
-                            operator=sp.sender,
-                            token_id=tx.token_id,
-                        )
-                    ),
-                    "FA2_NOT_OPERATOR",
-                )
-                with sp.if_(tx.amount > 0):
-                    sp.verify(
-                        (tx.amount == 1)
-                        & (self.data.ledger[tx.token_id] == transfer.from_),
-                        "FA2_INSUFFICIENT_BALANCE",
+            # Owner transfers never read the operators big map
+            with sp.if_(transfer.from_ == sp.sender):
+                with sp.for_("tx", transfer.txs) as tx:
+                    self.transfer_tx_(transfer.from_, tx, check_operator=False)
+            with sp.else_():
+                with sp.for_("tx", transfer.txs) as tx:
+                    self.transfer_tx_(transfer.from_, tx, check_operator=True)
+
+    def transfer_tx_(self, from_, tx, check_operator):
+        """Checks and applies a single transaction of a transfer from `from_`.
+        """
+        sp.set_type(
+            tx,
+            sp.TRecord(
+                to_=sp.TAddress, token_id=sp.TNat, amount=sp.TNat
+            ).layout(("to_", ("token_id", "amount"))),
+        )
+        sp.verify(tx.token_id < self.data.next_token_id, "FA2_TOKEN_UNDEFINED")
+        if check_operator:
+            sp.verify(
+                self.data.operators.contains(
+                    sp.record(
+                        owner=from_,
+                        operator=sp.sender,
+                        token_id=tx.token_id,
                     )
-                    self.data.ledger[tx.token_id] = tx.to_
+                ),
+                "FA2_NOT_OPERATOR",
+            )
+        with sp.if_(tx.amount > 0):
+            sp.verify(
+                (tx.amount == 1) & (self.data.ledger[tx.token_id] == from_),
+                "FA2_INSUFFICIENT_BALANCE",
+            )
+            self.data.ledger[tx.token_id] = tx.to_
 
     @sp.entry_point
     def update_operators(self, actions):
@@ -117,9 +171,9 @@ class Reward(sp.Contract):
                     sp.verify(operator.owner == sp.sender, "FA2_NOT_OWNER")
                     del self.data.operators[operator]
 
-    @sp.entry_point
-    def balance_of(self, args):
-
+    def balance_of_(self, requests):
+        """Logic of the `balance_of` entry point and `get_balance_of` view.
+        """
 
         def f_process_request(req):
             sp.verify(req.token_id < self.data.next_token_id, "FA2_TOKEN_UNDEFINED")
@@ -132,8 +186,32 @@ class Reward(sp.Contract):
                 )
             )
 
+        return requests.map(f_process_request)
+
+    @sp.entry_point
+    def balance_of(self, args):
+        """Send the balance of multiple account / token pairs to a callback
+        address."""
         sp.set_type(args, t_balance_of_args)
-        sp.transfer(args.requests.map(f_process_request), sp.mutez(0), args.callback)
+        sp.transfer(self.balance_of_(args.requests), sp.mutez(0), args.callback)
+
+    @sp.onchain_view(pure=True)
+    def get_balance_of(self, requests):
+        """Onchain view equivalent to the `balance_of` entry point."""
+        sp.set_type(requests, sp.TList(t_balance_of_request))
+        sp.result(
+            sp.set_type_expr(
+                self.balance_of_(requests), sp.TList(t_balance_of_response)
+            )
+        )
+
+    @sp.onchain_view(pure=True)
+    def owner_of(self, token_id):
+        """Returns the owner of the token `token_id`."""
+        sp.set_type(token_id, sp.TNat)
+        sp.result(
+            self.data.ledger.get_opt(token_id).open_some("FA2_TOKEN_UNDEFINED")
+        )
 
     def check_is_administrator(self):
         """Checks that the address that called the entry point is the contracts
@@ -147,29 +225,191 @@ class Reward(sp.Contract):
         """(Admin only) Create a new token with an incremented id and assign
         it. to `to_`.
 
+        The token metadata is computed from `base_uri` unless a per-token
+        override is given.
+
         Args:
             to_ (address): Receiver of the tokens.
-            metadata (map of string bytes): Metadata of the token.
+            metadata (option of map of string bytes): Metadata override of the
+                token.
         Raises:
             `FA2_NOT_ADMIN`
         """
+        sp.set_type(metadata, sp.TOption(sp.TMap(sp.TString, sp.TBytes)))
 
         # Check that the contracts is not paused
         sp.verify(~self.data.paused, message="MINT_PAUSED")
 
         sp.verify(sp.sender == self.data.administrator, "FA2_NOT_ADMIN")
         token_id = sp.compute(self.data.next_token_id)
-        self.data.token_metadata[token_id] = sp.record(
-            token_id=token_id, token_info=metadata
+        self.mint_token(token_id, to_, metadata)
+        self.data.next_token_id += 1
+
+    @sp.entry_point
+    def mint_batch(self, batch):
+        """(Admin only) Create a new token for each `to_` of the batch with
+        consecutive ids.
+
+        The pause and administrator checks are done once and `next_token_id`
+        is updated once for the whole batch.
+
+        Args:
+            batch (list of records): Receivers and metadata overrides of the
+                tokens.
+        Raises:
+            `FA2_NOT_ADMIN`
+        """
+        sp.set_type(
+            batch,
+            sp.TList(
+                sp.TRecord(
+                    to_=sp.TAddress,
+                    metadata=sp.TOption(sp.TMap(sp.TString, sp.TBytes)),
+                ).layout(("to_", "metadata"))
+            ),
         )
-        self.data.ledger[token_id] = to_
+
+        # Check that the contracts is not paused
+        sp.verify(~self.data.paused, message="MINT_PAUSED")
+
+        sp.verify(sp.sender == self.data.administrator, "FA2_NOT_ADMIN")
+        token_id = sp.local("token_id", self.data.next_token_id)
+        with sp.for_("action", batch) as action:
+            self.mint_token(token_id.value, action.to_, action.metadata)
+            token_id.value += 1
+        self.data.next_token_id = token_id.value
+
+    @sp.entry_point
+    def publish_reward_epoch(self, root):
+        """(Admin only) Publishes the Merkle root of a new reward epoch.
+
+        Each leaf is `reward_leaf(index, owner)` and the owners claim their
+        reward with `claim_reward`.
+
+        Args:
+            root (bytes): Merkle root of the epoch rewards.
+        """
+        # Define the input parameter data type
+        sp.set_type(root, sp.TBytes)
+
+        # Check that the administrator executed the entry point
+        self.check_is_administrator()
+
+        # Store the root under a new epoch id
+        self.data.reward_epochs[self.data.next_epoch_id] = root
+        self.data.next_epoch_id += 1
+
+    @sp.entry_point
+    def claim_reward(self, params):
+        """Mints the reward `index` of an epoch to the sender.
+
+        Args:
+            params (record): The `epoch_id`, the reward `index` and the
+                Merkle `proof` of the reward leaf.
+        Raises:
+            `MINT_PAUSED`, `REWARD_UNKNOWN_EPOCH`, `REWARD_ALREADY_CLAIMED`,
+            `REWARD_INVALID_PROOF`
+        """
+        sp.set_type(
+            params,
+            sp.TRecord(
+                epoch_id=sp.TNat, index=sp.TNat, proof=sp.TList(sp.TBytes)
+            ).layout(("epoch_id", ("index", "proof"))),
+        )
+
+        # Check that the contracts is not paused
+        sp.verify(~self.data.paused, message="MINT_PAUSED")
+
+        root = sp.compute(
+            self.data.reward_epochs.get_opt(params.epoch_id).open_some(
+                "REWARD_UNKNOWN_EPOCH"
+            )
+        )
+
+        # Check that the reward has not been claimed yet
+        word_key = sp.compute(
+            sp.pair(params.epoch_id, params.index // CLAIMED_WORD_BITS)
+        )
+        word = sp.compute(self.data.claimed_rewards.get(word_key, sp.nat(0)))
+        mask = sp.compute(sp.nat(1) << (params.index % CLAIMED_WORD_BITS))
+        sp.verify((word & mask) == 0, message="REWARD_ALREADY_CLAIMED")
+
+        # Check the proof of the sender's leaf
+        node = sp.local("node", reward_leaf(params.index, sp.sender))
+        with sp.for_("sibling", params.proof) as sibling:
+            node.value = hash_pair(node.value, sibling)
+        sp.verify(node.value == root, message="REWARD_INVALID_PROOF")
+
+        # Mark the reward as claimed and mint it
+        self.data.claimed_rewards[word_key] = word | mask
+        token_id = sp.compute(self.data.next_token_id)
+        self.mint_token(token_id, sp.sender, sp.none)
         self.data.next_token_id += 1
 
+    def mint_token(self, token_id, to_, metadata):
+        """Assigns the token `token_id` to `to_`, storing its metadata only if
+        an override is given.
+        """
+        with sp.if_(metadata.is_some()):
+            self.data.token_metadata[token_id] = sp.record(
+                token_id=token_id, token_info=metadata.open_some()
+            )
+        self.data.ledger[token_id] = to_
+
+    @sp.entry_point
+    def set_base_uri(self, base_uri):
+        """Sets the base URI of the tokens without metadata override.
+        """
+        # Define the input parameter data type
+        sp.set_type(base_uri, sp.TBytes)
+
+        # Check that the administrator executed the entry point
+        self.check_is_administrator()
+
+        # Set the new base URI
+        self.data.base_uri = base_uri
+
     @sp.offchain_view(pure=True)
     def all_tokens(self):
         """Return the list of all the `token_id` known to the contracts."""
         sp.result(sp.range(0, self.data.next_token_id))
 
+    @sp.offchain_view(pure=True)
+    def all_tokens_page(self, params):
+        """Return the `token_id` in [offset, offset + limit) that have an
+        owner."""
+        sp.set_type(
+            params,
+            sp.TRecord(offset=sp.TNat, limit=sp.TNat).layout(("offset", "limit")),
+        )
+        token_ids = sp.local("token_ids", sp.list([], t=sp.TNat))
+        end = sp.compute(
+            sp.min(params.offset + params.limit, self.data.next_token_id)
+        )
+        with sp.for_("token_id", sp.range(params.offset, end)) as token_id:
+            with sp.if_(self.data.ledger.contains(token_id)):
+                token_ids.value.push(token_id)
+        sp.result(token_ids.value.rev())
+
+    @sp.offchain_view(pure=True)
+    def tokens_of_owner(self, params):
+        """Return the `token_id` in [offset, offset + limit) owned by
+        `owner`."""
+        sp.set_type(
+            params,
+            sp.TRecord(owner=sp.TAddress, offset=sp.TNat, limit=sp.TNat).layout(
+                ("owner", ("offset", "limit"))
+            ),
+        )
+        token_ids = sp.local("token_ids", sp.list([], t=sp.TNat))
+        end = sp.compute(
+            sp.min(params.offset + params.limit, self.data.next_token_id)
+        )
+        with sp.for_("token_id", sp.range(params.offset, end)) as token_id:
+            with sp.if_(self.data.ledger.get_opt(token_id) == sp.some(params.owner)):
+                token_ids.value.push(token_id)
+        sp.result(token_ids.value.rev())
+
     @sp.offchain_view(pure=True)
     def get_balance(self, params):
         """Return the balance of an address for the specified `token_id`."""
@@ -189,6 +429,27 @@ class Reward(sp.Contract):
         sp.verify(params.token_id < self.data.next_token_id, "FA2_TOKEN_UNDEFINED")
         sp.result(1)
 
+    @sp.offchain_view(pure=True)
+    def token_metadata(self, token_id):
+        """Return the metadata of the token, its TZIP-21 URI is `base_uri`
+        followed by the `token_id` unless it has an override."""
+        sp.set_type(token_id, sp.TNat)
+        sp.verify(token_id < self.data.next_token_id, "FA2_TOKEN_UNDEFINED")
+        metadata = sp.local(
+            "metadata",
+            sp.record(
+                token_id=token_id,
+                token_info=sp.map(
+                    {"": self.data.base_uri + nat_to_bytes(token_id)},
+                    tkey=sp.TString,
+                    tvalue=sp.TBytes,
+                ),
+            ),
+        )
+        with sp.if_(self.data.token_metadata.contains(token_id)):
+            metadata.value = self.data.token_metadata[token_id]
+        sp.result(metadata.value)
+
     @sp.offchain_view(pure=True)
     def is_operator(self, params):
         """Return whether `operator` is allowed to transfer `token_id` tokens
@@ -336,9 +597,106 @@ if "templates" not in __name__:
                  metadata_base,
                  "https://fatcow.io",
                  fa2=sp.address("tz1KozzwY6LrGDsZkTPLGwbh13HNezL21JMV"),
+                 base_uri="ipfs://rewards/",
                  )
         scenario += c1
 
+        scenario.h2("Mint with and without metadata override")
+        c1.mint(to_=alice.address, metadata=sp.none).run(sender=alice, valid=False)
+        c1.mint(to_=alice.address, metadata=sp.none).run(sender=admin)
+        c1.mint(to_=bob.address, metadata=sp.some(tok1_md)).run(sender=admin)
+        scenario.verify(~c1.data.token_metadata.contains(0))
+        scenario.verify(
+            c1.token_metadata(0).token_info[""]
+            == sp.utils.bytes_of_string("ipfs://rewards/0")
+        )
+        scenario.verify(c1.token_metadata(1).token_info == tok1_md)
+
+        scenario.h2("Mint a batch")
+        c1.mint_batch(
+            [
+                sp.record(to_=alice.address, metadata=sp.none),
+                sp.record(to_=bob.address, metadata=sp.some(tok2_md)),
+            ]
+        ).run(sender=bob, valid=False, exception="FA2_NOT_ADMIN")
+        c1.set_pause(True).run(sender=admin)
+        c1.mint_batch([sp.record(to_=alice.address, metadata=sp.none)]).run(
+            sender=admin, valid=False, exception="MINT_PAUSED"
+        )
+        c1.set_pause(False).run(sender=admin)
+        c1.mint_batch(
+            [
+                sp.record(to_=alice.address, metadata=sp.none),
+                sp.record(to_=bob.address, metadata=sp.some(tok2_md)),
+            ]
+        ).run(sender=admin)
+        scenario.verify(c1.data.next_token_id == 4)
+        scenario.verify(c1.data.ledger[3] == bob.address)
+        scenario.verify(~c1.data.token_metadata.contains(2))
+        scenario.verify(c1.token_metadata(3).token_info == tok2_md)
+
+        scenario.h2("On-chain balance views")
+        scenario.verify(c1.owner_of(1) == bob.address)
+        scenario.verify(
+            c1.get_balance_of(
+                [
+                    sp.record(owner=alice.address, token_id=0),
+                    sp.record(owner=alice.address, token_id=1),
+                ]
+            )
+            == sp.list(
+                [
+                    sp.record(
+                        request=sp.record(owner=alice.address, token_id=0),
+                        balance=1,
+                    ),
+                    sp.record(
+                        request=sp.record(owner=alice.address, token_id=1),
+                        balance=0,
+                    ),
+                ]
+            )
+        )
+
+        scenario.h2("Paginated token views")
+        scenario.verify(
+            c1.all_tokens_page(sp.record(offset=1, limit=2)) == sp.list([1, 2])
+        )
+        scenario.verify(
+            c1.tokens_of_owner(sp.record(owner=bob.address, offset=0, limit=5))
+            == sp.list([1, 3])
+        )
+
+        scenario.h2("Change the base URI")
+        c1.set_base_uri(sp.utils.bytes_of_string("ipfs://new/")).run(sender=admin)
+        c1.mint_batch([sp.record(to_=alice.address, metadata=sp.none)] * 7).run(
+            sender=admin
+        )
+        scenario.verify(
+            c1.token_metadata(10).token_info[""]
+            == sp.utils.bytes_of_string("ipfs://new/10")
+        )
+
+        scenario.h2("Claim rewards of a Merkle epoch")
+        alice_leaf = scenario.compute(reward_leaf(0, alice.address))
+        bob_leaf = scenario.compute(reward_leaf(1, bob.address))
+        root = scenario.compute(hash_pair(alice_leaf, bob_leaf))
+        c1.publish_reward_epoch(root).run(sender=alice, valid=False)
+        c1.publish_reward_epoch(root).run(sender=admin)
+        c1.claim_reward(epoch_id=1, index=0, proof=[bob_leaf]).run(
+            sender=alice, valid=False, exception="REWARD_UNKNOWN_EPOCH"
+        )
+        c1.claim_reward(epoch_id=0, index=0, proof=[bob_leaf]).run(
+            sender=bob, valid=False, exception="REWARD_INVALID_PROOF"
+        )
+        c1.claim_reward(epoch_id=0, index=0, proof=[bob_leaf]).run(sender=alice)
+        scenario.verify(c1.data.ledger[11] == alice.address)
+        c1.claim_reward(epoch_id=0, index=0, proof=[bob_leaf]).run(
+            sender=alice, valid=False, exception="REWARD_ALREADY_CLAIMED"
+        )
+        c1.claim_reward(epoch_id=0, index=1, proof=[alice_leaf]).run(sender=bob)
+        scenario.verify(c1.data.ledger[12] == bob.address)
+
 
     sp.add_compilation_target(
         "FatCowIOReward",
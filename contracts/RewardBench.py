@@ -0,0 +1,118 @@
+import smartpy as sp
+
+reward_module = sp.io.import_script_from_url("file:contracts/Reward.py")
+
+# Number of txs per transfer used to compare owner and operator transfers.
+BATCH_SIZES = [1, 10, 50, 100, 200]
+
+
+class BaselineReward(reward_module.Reward):
+    """Reward with the transfer it had before the owner fast path: the
+    operator check reads the operators big map for every tx unless the
+    sender is the owner.
+    """
+
+    @sp.entry_point
+    def transfer(self, batch):
+        with sp.for_("transfer", batch) as transfer:
+            with sp.for_("tx", transfer.txs) as tx:
+                sp.set_type(
+                    tx,
+                    sp.TRecord(
+                        to_=sp.TAddress, token_id=sp.TNat, amount=sp.TNat
+                    ).layout(("to_", ("token_id", "amount"))),
+                )
+                sp.verify(tx.token_id < self.data.next_token_id, "FA2_TOKEN_UNDEFINED")
+                sp.verify(
+                    (transfer.from_ == sp.sender)
+                    | self.data.operators.contains(
+                        sp.record(
+                            owner=transfer.from_,
+                            operator=sp.sender,
+                            token_id=tx.token_id,
+                        )
+                    ),
+                    "FA2_NOT_OPERATOR",
+                )
+                with sp.if_(tx.amount > 0):
+                    sp.verify(
+                        (tx.amount == 1)
+                        & (self.data.ledger[tx.token_id] == transfer.from_),
+                        "FA2_INSUFFICIENT_BALANCE",
+                    )
+                    self.data.ledger[tx.token_id] = tx.to_
+
+
+def run_transfers(scenario, contract, admin, alice, bob, batch_size):
+    """Mints `batch_size` tokens to alice, transfers them to bob as their
+    owner, then back to alice as an operator of bob.
+    """
+    scenario += contract
+    contract.mint_batch(
+        [sp.record(to_=alice.address, metadata=sp.none)] * batch_size
+    ).run(sender=admin)
+
+    scenario.h3("Owner transfer of %d txs" % batch_size)
+    contract.transfer(
+        [
+            sp.record(
+                from_=alice.address,
+                txs=[
+                    sp.record(to_=bob.address, token_id=token_id, amount=1)
+                    for token_id in range(batch_size)
+                ],
+            )
+        ]
+    ).run(sender=alice)
+
+    scenario.h3("Operator transfer of %d txs" % batch_size)
+    contract.update_operators(
+        [
+            sp.variant(
+                "add_operator",
+                sp.record(owner=bob.address, operator=alice.address, token_id=token_id),
+            )
+            for token_id in range(batch_size)
+        ]
+    ).run(sender=bob)
+    contract.transfer(
+        [
+            sp.record(
+                from_=bob.address,
+                txs=[
+                    sp.record(to_=alice.address, token_id=token_id, amount=1)
+                    for token_id in range(batch_size)
+                ],
+            )
+        ]
+    ).run(sender=alice)
+    scenario.verify(contract.data.ledger[0] == alice.address)
+
+
+def add_transfer_benchmark(batch_size):
+    @sp.add_test(name="Bench Transfer %d" % batch_size)
+    def bench_transfer():
+        scenario = sp.test_scenario()
+        admin = sp.test_account("Administrator")
+        alice = sp.test_account("Alice")
+        bob = sp.test_account("Bob")
+
+        # Gas per operation is reported in the scenario output; compare the
+        # same transfers on the baseline and on the current Reward.
+        for title, contract_class in [
+            ("Baseline transfer", BaselineReward),
+            ("Owner fast path transfer", reward_module.Reward),
+        ]:
+            scenario.h2(title)
+            contract = contract_class(
+                admin.address,
+                admin.address,
+                reward_module.metadata_base,
+                "https://fatcow.io",
+                fa2=sp.address("tz1KozzwY6LrGDsZkTPLGwbh13HNezL21JMV"),
+            )
+            run_transfers(scenario, contract, admin, alice, bob, batch_size)
+
+
+for batch_size in BATCH_SIZES:
+    add_transfer_benchmark(batch_size)
@@ -23,6 +23,17 @@ t_update_operators_params = sp.TList(
     )
 )
 
+t_operator_for_all_permission = sp.TRecord(
+    owner=sp.TAddress, operator=sp.TAddress
+).layout(("owner", "operator"))
+
+t_update_operators_for_all_params = sp.TList(
+    sp.TVariant(
+        add_operator_for_all=t_operator_for_all_permission,
+        remove_operator_for_all=t_operator_for_all_permission,
+    )
+)
+
 t_transfer_batch = sp.TRecord(
     from_=sp.TAddress,
     txs=sp.TList(
@@ -36,6 +47,20 @@ t_transfer_batch = sp.TRecord(
 
 t_transfer_params = sp.TList(t_transfer_batch)
 
+t_burn_params = sp.TList(
+    sp.TRecord(from_=sp.TAddress, token_id=sp.TNat, amount=sp.TNat).layout(
+        ("from_", ("token_id", "amount"))
+    )
+)
+
+t_token_page_params = sp.TRecord(offset=sp.TNat, limit=sp.TNat).layout(
+    ("offset", "limit")
+)
+
+t_owner_token_page_params = sp.TRecord(
+    owner=sp.TAddress, offset=sp.TNat, limit=sp.TNat
+).layout(("owner", ("offset", "limit")))
+
 t_balance_of_request = sp.TRecord(owner=sp.TAddress, token_id=sp.TNat).layout(
     ("owner", "token_id")
 )
@@ -96,8 +121,15 @@ class OwnerOrOperatorTransfer:
     """(Transfer Policy) Only owner and operators can transfer tokens.
 
     Operators allowed.
+
+    If `operator_for_all` is True, adds an `update_operators_for_all`
+    entrypoint with which owners approve an operator for all their tokens
+    with a single `operators_for_all` entry.
     """
 
+    def __init__(self, operator_for_all=False):
+        self.operator_for_all = operator_for_all
+
     def init_policy(self, contract):
         self.name = "owner-or-operator-transfer"
         self.supports_transfer = True
@@ -105,20 +137,72 @@ class OwnerOrOperatorTransfer:
         contract.update_initial_storage(
             operators=sp.big_map(tkey=t_operator_permission, tvalue=sp.TUnit)
         )
+        if self.operator_for_all:
+            contract.update_initial_storage(
+                operators_for_all=sp.big_map(
+                    tkey=t_operator_for_all_permission, tvalue=sp.TUnit
+                )
+            )
+
+            # Add an update_operators_for_all entrypoint
+            def update_operators_for_all(self, batch):
+                """Accept a list of variants to add or remove operators who
+                can perform transfers of any token on behalf of the owner."""
+                sp.set_type(batch, t_update_operators_for_all_params)
+                with sp.for_("action", batch) as action:
+                    with action.match_cases() as arg:
+                        with arg.match("add_operator_for_all") as operator:
+                            self.policy.check_operator_update_permissions(
+                                self, operator
+                            )
+                            self.data.operators_for_all[operator] = sp.unit
+                        with arg.match("remove_operator_for_all") as operator:
+                            self.policy.check_operator_update_permissions(
+                                self, operator
+                            )
+                            del self.data.operators_for_all[operator]
+
+            contract.update_operators_for_all = sp.entry_point(
+                update_operators_for_all
+            )
 
     def check_tx_transfer_permissions(self, contract, from_, to_, token_id):
-        sp.verify(
-            (sp.sender == from_)
-            | contract.data.operators.contains(
-                sp.record(owner=from_, operator=sp.sender, token_id=token_id)
-            ),
-            message="FA2_NOT_OPERATOR",
-        )
+        if self.operator_for_all:
+            # Nested so that no big map is read when the owner transfers.
+            with sp.if_(sp.sender != from_):
+                with sp.if_(
+                    ~contract.data.operators_for_all.contains(
+                        sp.record(owner=from_, operator=sp.sender)
+                    )
+                ):
+                    sp.verify(
+                        contract.data.operators.contains(
+                            sp.record(
+                                owner=from_, operator=sp.sender, token_id=token_id
+                            )
+                        ),
+                        message="FA2_NOT_OPERATOR",
+                    )
+        else:
+            sp.verify(
+                (sp.sender == from_)
+                | contract.data.operators.contains(
+                    sp.record(owner=from_, operator=sp.sender, token_id=token_id)
+                ),
+                message="FA2_NOT_OPERATOR",
+            )
 
     def check_operator_update_permissions(self, contract, operator_permission):
         sp.verify(operator_permission.owner == sp.sender, "FA2_NOT_OWNER")
 
     def is_operator(self, contract, operator_permission):
+        if self.operator_for_all:
+            return contract.data.operators_for_all.contains(
+                sp.record(
+                    owner=operator_permission.owner,
+                    operator=operator_permission.operator,
+                )
+            ) | contract.data.operators.contains(operator_permission)
         return contract.data.operators.contains(operator_permission)
 
 
@@ -180,6 +264,44 @@ class OffchainViewsNft:
         """Return the list of all the token IDs known to the contract."""
         sp.result(sp.range(0, self.data.last_token_id))
 
+    def token_ids_page_(self, offset, limit, owner=None):
+        """Return the owned token ids in [offset, offset + limit), only those
+        of `owner` if given.
+
+        Burned tokens have no ledger entry and are skipped.
+        """
+        token_ids = sp.local("token_ids", sp.list([], t=sp.TNat))
+        end = sp.compute(sp.min(offset + limit, self.data.last_token_id))
+        with sp.for_("token_id", sp.range(offset, end)) as token_id:
+            if owner is None:
+                with sp.if_(self.data.ledger.contains(token_id)):
+                    token_ids.value.push(token_id)
+            else:
+                with sp.if_(self.data.ledger.get_opt(token_id) == sp.some(owner)):
+                    token_ids.value.push(token_id)
+        return token_ids.value.rev()
+
+    @sp.offchain_view(pure=True)
+    def all_tokens_page(self, params):
+        """Return the existing token IDs in [offset, offset + limit)."""
+        sp.set_type(params, t_token_page_params)
+        sp.result(self.token_ids_page_(params.offset, params.limit))
+
+    @sp.offchain_view(pure=True)
+    def tokens_of_owner(self, params):
+        """Return the token IDs in [offset, offset + limit) owned by
+        `owner`.
+
+        `offset` and `limit` page the global token ids, not the tokens of
+        `owner`: there is no per-owner index, the window is scanned and
+        filtered by owner. A page can be empty while `owner` holds tokens
+        after it, and listing all the tokens of an owner costs a scan of
+        every token id."""
+        sp.set_type(params, t_owner_token_page_params)
+        sp.result(
+            self.token_ids_page_(params.offset, params.limit, owner=params.owner)
+        )
+
     @sp.offchain_view(pure=True)
     def get_balance(self, params):
         """Return the balance of an address for the specified `token_id`."""
@@ -273,6 +395,10 @@ class Common(sp.Contract):
     def is_defined(self, token_id):
         return self.data.token_metadata.contains(token_id)
 
+    def delete_token_metadata(self, token_id):
+        """Removes the metadata of a burned token."""
+        del self.data.token_metadata[token_id]
+
     def generate_contract_metadata(self, filename, metadata_base=None):
         """Generate a metadata json file with all the contract's offchain views
         and standard TZIP-126 and TZIP-016 key/values."""
@@ -325,7 +451,8 @@ class Common(sp.Contract):
 class Fa2Nft(OffchainViewsNft, Common):
     """Base class for a FA2 NFT contract.
 
-    Respects the FA2 standard.
+    Respects the FA2 standard. A token is defined if and only if it has an
+    owner in the `ledger`.
     """
 
     def __init__(
@@ -361,6 +488,10 @@ class Fa2Nft(OffchainViewsNft, Common):
                 raise Exception(
                     "Ledger contains token_id with no corresponding metadata"
                 )
+        # `transfer` and `burn` rely on every defined token having an owner.
+        for token_id in token_metadata_dict:
+            if token_id not in ledger:
+                raise Exception("Token metadata contains token_id with no owner")
         return (ledger, token_metadata_dict)
 
     def balance_of_(self, requests):
@@ -394,14 +525,19 @@ class Fa2Nft(OffchainViewsNft, Common):
             with sp.for_("transfer", batch) as transfer:
                 with sp.for_("tx", transfer.txs) as tx:
                     # The ordering of sp.verify is important: 1) token_undefined, 2) transfer permission 3) balance
-                    sp.verify(self.is_defined(tx.token_id), "FA2_TOKEN_UNDEFINED")
+                    # Every defined token has a ledger entry: one lookup
+                    # checks the definition and gives the owner.
+                    owner = sp.compute(
+                        self.data.ledger.get_opt(tx.token_id).open_some(
+                            "FA2_TOKEN_UNDEFINED"
+                        )
+                    )
                     self.policy.check_tx_transfer_permissions(
                         self, transfer.from_, tx.to_, tx.token_id
                     )
                     with sp.if_(tx.amount > 0):
                         sp.verify(
-                            (tx.amount == 1)
-                            & (self.data.ledger[tx.token_id] == transfer.from_),
+                            (tx.amount == 1) & (owner == transfer.from_),
                             message="FA2_INSUFFICIENT_BALANCE",
                         )
                         # Do the transfer
@@ -414,13 +550,23 @@ class Fa2Fungible(OffchainViewsFungible, Common):
     """Base class for a FA2 fungible contract.
 
     Respects the FA2 standard.
+
+    If `aggregate_transfers` is True, `transfer` reads and writes each
+    distinct ledger key of a batch only once.
     """
 
     def __init__(
-        self, metadata, token_metadata=[], ledger={}, policy=None, metadata_base=None
+        self,
+        metadata,
+        token_metadata=[],
+        ledger={},
+        policy=None,
+        metadata_base=None,
+        aggregate_transfers=False,
     ):
         metadata = sp.set_type_expr(metadata, sp.TBigMap(sp.TString, sp.TBytes))
         self.ledger_type = "Fungible"
+        self.aggregate_transfers = aggregate_transfers
         ledger, supply, token_metadata = self.initial_mint(token_metadata, ledger)
         self.init(
             ledger=sp.big_map(
@@ -482,7 +628,11 @@ class Fa2Fungible(OffchainViewsFungible, Common):
         """Accept a list of transfer operations between a source and multiple
         destinations."""
         sp.set_type(batch, t_transfer_params)
-        if self.policy.supports_transfer:
+        if not self.policy.supports_transfer:
+            sp.failwith("FA2_TX_DENIED")
+        elif self.aggregate_transfers:
+            self.aggregated_transfer_(batch)
+        else:
             with sp.for_("transfer", batch) as transfer:
                 with sp.for_("tx", transfer.txs) as tx:
                     # The ordering of sp.verify is important: 1) token_undefined, 2) transfer permission 3) balance
@@ -498,8 +648,39 @@ class Fa2Fungible(OffchainViewsFungible, Common):
                     # Do the transfer
                     to_ = (tx.to_, tx.token_id)
                     self.data.ledger[to_] = self.data.ledger.get(to_, 0) + tx.amount
-        else:
-            sp.failwith("FA2_TX_DENIED")
+
+    def aggregated_transfer_(self, batch):
+        """Logic of the transfer entrypoint with `aggregate_transfers`.
+
+        The txs are applied in order on a local copy of the touched ledger
+        entries, so failures are the same as with the default logic. Each
+        distinct key is read once and written back once.
+        """
+        balances = sp.local(
+            "balances",
+            sp.map(tkey=sp.TPair(sp.TAddress, sp.TNat), tvalue=sp.TNat),
+        )
+        with sp.for_("transfer", batch) as transfer:
+            with sp.for_("tx", transfer.txs) as tx:
+                # The ordering of sp.verify is important: 1) token_undefined, 2) transfer permission 3) balance
+                sp.verify(self.is_defined(tx.token_id), "FA2_TOKEN_UNDEFINED")
+                self.policy.check_tx_transfer_permissions(
+                    self, transfer.from_, tx.to_, tx.token_id
+                )
+                from_ = sp.compute(sp.pair(transfer.from_, tx.token_id))
+                with sp.if_(~balances.value.contains(from_)):
+                    balances.value[from_] = self.data.ledger.get(from_, 0)
+                balances.value[from_] = sp.as_nat(
+                    balances.value[from_] - tx.amount,
+                    message="FA2_INSUFFICIENT_BALANCE",
+                )
+                # Do the transfer
+                to_ = sp.compute(sp.pair(tx.to_, tx.token_id))
+                with sp.if_(~balances.value.contains(to_)):
+                    balances.value[to_] = self.data.ledger.get(to_, 0)
+                balances.value[to_] += tx.amount
+        with sp.for_("balance", balances.value.items()) as balance:
+            self.data.ledger[balance.key] = balance.value
 
 
 ##########
@@ -605,6 +786,82 @@ class MintNft:
             self.data.last_token_id += 1
 
 
+class MintNftEditions:
+    """(Mixin) Non-standard `create_edition_series` and `mint_editions`
+    entrypoints for FA2Nft.
+
+    The metadata of an edition series is stored once in `edition_series`,
+    each edition only stores its series id in `token_series`. Provides a
+    `token_metadata` offchain view that resolves it, use it instead of
+    `OffchainviewTokenMetadata`.
+
+    Requires the `Admin` mixin.
+    """
+
+    def __init__(self):
+        self.update_initial_storage(
+            edition_series=sp.big_map(
+                tkey=sp.TNat, tvalue=sp.TMap(sp.TString, sp.TBytes)
+            ),
+            token_series=sp.big_map(tkey=sp.TNat, tvalue=sp.TNat),
+            last_series_id=sp.nat(0),
+        )
+
+    def is_defined(self, token_id):
+        # Editions have no `token_metadata` entry but always have an owner.
+        return self.data.ledger.contains(token_id)
+
+    def delete_token_metadata(self, token_id):
+        # A burned edition no longer points to its series.
+        del self.data.token_metadata[token_id]
+        del self.data.token_series[token_id]
+
+    @sp.entry_point
+    def create_edition_series(self, metadata):
+        """Admin can create a new edition series with incrementing id."""
+        sp.set_type(metadata, sp.TMap(sp.TString, sp.TBytes))
+        sp.verify(self.is_administrator(sp.sender), "FA2_NOT_ADMIN")
+        self.data.edition_series[self.data.last_series_id] = metadata
+        self.data.last_series_id += 1
+
+    @sp.entry_point
+    def mint_editions(self, batch):
+        """Admin can mint new editions of existing series."""
+        sp.set_type(batch, sp.TList(sp.TRecord(series_id=sp.TNat, to_=sp.TAddress)))
+        sp.verify(self.is_administrator(sp.sender), "FA2_NOT_ADMIN")
+        first_token_id = sp.compute(self.data.last_token_id)
+        self.data.last_token_id = first_token_id + sp.len(batch)
+        token_id = sp.local("token_id", first_token_id)
+        with sp.for_("action", batch) as action:
+            sp.verify(
+                self.data.edition_series.contains(action.series_id),
+                "FA2_SERIES_UNDEFINED",
+            )
+            self.data.token_series[token_id.value] = action.series_id
+            self.data.ledger[token_id.value] = action.to_
+            token_id.value += 1
+
+    @sp.offchain_view()
+    def token_metadata(self, token_id):
+        """Returns the token-metadata URI for the given token, from its edition
+        series if it has no metadata of its own."""
+        sp.set_type(token_id, sp.TNat)
+        sp.verify(self.is_defined(token_id), "FA2_TOKEN_UNDEFINED")
+        metadata = sp.local(
+            "metadata",
+            sp.record(
+                token_id=token_id, token_info=sp.map(tkey=sp.TString, tvalue=sp.TBytes)
+            ),
+        )
+        with sp.if_(self.data.token_metadata.contains(token_id)):
+            metadata.value = self.data.token_metadata[token_id]
+        with sp.else_():
+            metadata.value.token_info = self.data.edition_series[
+                self.data.token_series[token_id]
+            ]
+        sp.result(metadata.value)
+
+
 class MintFungible:
     """(Mixin) Non-standard `mint` entrypoint for FA2Fungible with incrementing
     id.
@@ -645,21 +902,26 @@ class BurnNft:
 
         Burning an nft destroys its metadata.
         """
+        sp.set_type(batch, t_burn_params)
         sp.verify(self.policy.supports_transfer, "FA2_TX_DENIED")
         with sp.for_("action", batch) as action:
-            sp.verify(self.is_defined(action.token_id), "FA2_TOKEN_UNDEFINED")
+            # Same single ledger lookup as in `Fa2Nft.transfer`.
+            owner = sp.compute(
+                self.data.ledger.get_opt(action.token_id).open_some(
+                    "FA2_TOKEN_UNDEFINED"
+                )
+            )
             self.policy.check_tx_transfer_permissions(
                 self, action.from_, action.from_, action.token_id
             )
             with sp.if_(action.amount > 0):
                 sp.verify(
-                    (action.amount == sp.nat(1))
-                    & (self.data.ledger[action.token_id] == action.from_),
+                    (action.amount == sp.nat(1)) & (owner == action.from_),
                     message="FA2_INSUFFICIENT_BALANCE",
                 )
                 # Burn the token
                 del self.data.ledger[action.token_id]
-                del self.data.token_metadata[action.token_id]
+                self.delete_token_metadata(action.token_id)
 
 
 class BurnFungible:
@@ -762,6 +1024,22 @@ if "templates" not in __name__:
             )
             Admin.__init__(self, admin.address)
 
+    class NftEditionsTest(
+        Admin,
+        MintNftEditions,
+        MintNft,
+        BurnNft,
+        Fa2Nft,
+    ):
+        """NFT contract with edition series."""
+
+        def __init__(self, policy=None):
+            Fa2Nft.__init__(
+                self, sp.utils.metadata_of_url("ipfs://example"), policy=policy
+            )
+            Admin.__init__(self, admin.address)
+            MintNftEditions.__init__(self)
+
     class FungibleTest(
         Admin,
         ChangeMetadata,
@@ -796,10 +1074,153 @@ if "templates" not in __name__:
     TESTS.test_no_transfer("nft", nft_test(policy=NoTransfer()))
     TESTS.test_owner_transfer("nft", nft_test(policy=OwnerTransfer()))
     TESTS.test_owner_or_operator_transfer("nft", nft_test())
+    TESTS.test_owner_or_operator_transfer(
+        "nft_operator_for_all",
+        nft_test(policy=OwnerOrOperatorTransfer(operator_for_all=True)),
+    )
+
+    @sp.add_test(name="nft_update_operators_for_all")
+    def test_operator_for_all():
+        bob = sp.test_account("Bob")
+        scenario = sp.test_scenario()
+        c1 = nft_test(policy=OwnerOrOperatorTransfer(operator_for_all=True))
+        scenario += c1
+
+        scenario.h2("Only the owner can add an operator for all tokens")
+        operator_for_all = sp.record(owner=alice.address, operator=bob.address)
+        c1.update_operators_for_all(
+            [sp.variant("add_operator_for_all", operator_for_all)]
+        ).run(sender=bob, valid=False, exception="FA2_NOT_OWNER")
+        c1.update_operators_for_all(
+            [sp.variant("add_operator_for_all", operator_for_all)]
+        ).run(sender=alice)
+        scenario.verify(
+            c1.is_operator(
+                sp.record(owner=alice.address, operator=bob.address, token_id=2)
+            )
+        )
+
+        scenario.h2("The operator can transfer any token of the owner")
+        c1.transfer(
+            [
+                sp.record(
+                    from_=alice.address,
+                    txs=[
+                        sp.record(to_=bob.address, token_id=0, amount=1),
+                        sp.record(to_=bob.address, token_id=1, amount=1),
+                    ],
+                )
+            ]
+        ).run(sender=bob)
+        scenario.verify(c1.data.ledger[1] == bob.address)
+
+        scenario.h2("Removed operators can't transfer anymore")
+        c1.update_operators_for_all(
+            [sp.variant("remove_operator_for_all", operator_for_all)]
+        ).run(sender=alice)
+        c1.transfer(
+            [
+                sp.record(
+                    from_=alice.address,
+                    txs=[sp.record(to_=bob.address, token_id=2, amount=1)],
+                )
+            ]
+        ).run(sender=bob, valid=False, exception="FA2_NOT_OPERATOR")
+
+    @sp.add_test(name="nft_editions")
+    def test_nft_editions():
+        bob = sp.test_account("Bob")
+        scenario = sp.test_scenario()
+        c1 = NftEditionsTest()
+        scenario += c1
+
+        scenario.h2("Only the admin can create series and mint editions")
+        c1.create_edition_series(tok0_md).run(
+            sender=alice, valid=False, exception="FA2_NOT_ADMIN"
+        )
+        c1.create_edition_series(tok0_md).run(sender=admin)
+        c1.mint_editions([sp.record(series_id=0, to_=alice.address)]).run(
+            sender=alice, valid=False, exception="FA2_NOT_ADMIN"
+        )
+        c1.mint_editions([sp.record(series_id=1, to_=alice.address)]).run(
+            sender=admin, valid=False, exception="FA2_SERIES_UNDEFINED"
+        )
+
+        scenario.h2("Editions share the series metadata")
+        c1.mint_editions(
+            [
+                sp.record(series_id=0, to_=alice.address),
+                sp.record(series_id=0, to_=bob.address),
+            ]
+        ).run(sender=admin)
+        c1.mint([sp.record(metadata=tok1_md, to_=alice.address)]).run(sender=admin)
+        scenario.verify(c1.data.last_token_id == 3)
+        scenario.verify(~c1.data.token_metadata.contains(1))
+        scenario.verify(c1.token_metadata(1).token_id == 1)
+        scenario.verify(c1.token_metadata(1).token_info == tok0_md)
+        scenario.verify(c1.token_metadata(2).token_info == tok1_md)
+        scenario.verify(c1.get_balance(sp.record(owner=bob.address, token_id=1)) == 1)
+
+        scenario.h2("Editions can be transferred and burned")
+        c1.transfer(
+            [
+                sp.record(
+                    from_=alice.address,
+                    txs=[sp.record(to_=bob.address, token_id=0, amount=1)],
+                )
+            ]
+        ).run(sender=alice)
+        c1.burn([sp.record(from_=bob.address, token_id=0, amount=1)]).run(sender=bob)
+        scenario.verify(~c1.data.ledger.contains(0))
+        scenario.verify(~c1.data.token_series.contains(0))
+        scenario.verify(c1.data.token_series[1] == 0)
+
+    @sp.add_test(name="nft_pagination")
+    def test_nft_pagination():
+        bob = sp.test_account("Bob")
+        scenario = sp.test_scenario()
+        c1 = NftTest()
+        scenario += c1
+        c1.mint(
+            [sp.record(metadata=md, to_=alice.address) for md in TOKEN_METADATA]
+        ).run(sender=admin)
+        c1.burn([sp.record(from_=alice.address, token_id=0, amount=1)]).run(
+            sender=alice
+        )
+        c1.transfer(
+            [
+                sp.record(
+                    from_=alice.address,
+                    txs=[sp.record(to_=bob.address, token_id=1, amount=1)],
+                )
+            ]
+        ).run(sender=alice)
+
+        scenario.h2("Paginated views skip burned tokens")
+        scenario.verify(
+            c1.all_tokens_page(sp.record(offset=0, limit=10)) == sp.list([1, 2])
+        )
+        scenario.verify(
+            c1.all_tokens_page(sp.record(offset=2, limit=10)) == sp.list([2])
+        )
+
+        scenario.h2("Owner pages are windows of the global token ids")
+        scenario.verify(
+            c1.tokens_of_owner(sp.record(owner=alice.address, offset=0, limit=2))
+            == sp.list([], t=sp.TNat)
+        )
+        scenario.verify(
+            c1.tokens_of_owner(sp.record(owner=alice.address, offset=0, limit=3))
+            == sp.list([2])
+        )
+        scenario.verify(
+            c1.tokens_of_owner(sp.record(owner=bob.address, offset=0, limit=10))
+            == sp.list([1])
+        )
 
     # Fa2Fungible
 
-    def fungible_test(policy=None):
+    def fungible_test(policy=None, aggregate_transfers=False):
         return Fa2Fungible(
             metadata=sp.utils.metadata_of_url("ipfs://example"),
             token_metadata=TOKEN_METADATA,
@@ -809,6 +1230,7 @@ if "templates" not in __name__:
                 (alice.address, 2): 42,
             },
             policy=policy,
+            aggregate_transfers=aggregate_transfers,
         )
 
     TESTS.test_core_interfaces("fungible", fungible_test())
@@ -817,6 +1239,16 @@ if "templates" not in __name__:
     TESTS.test_no_transfer("fungible", fungible_test(policy=NoTransfer()))
     TESTS.test_owner_transfer("fungible", fungible_test(policy=OwnerTransfer()))
     TESTS.test_owner_or_operator_transfer("fungible", fungible_test())
+    TESTS.test_transfers(
+        "fungible_aggregated", fungible_test(aggregate_transfers=True)
+    )
+    TESTS.test_owner_transfer(
+        "fungible_aggregated",
+        fungible_test(policy=OwnerTransfer(), aggregate_transfers=True),
+    )
+    TESTS.test_owner_or_operator_transfer(
+        "fungible_aggregated", fungible_test(aggregate_transfers=True)
+    )
 
     # Optional Features
 
@@ -0,0 +1,196 @@
+"""Ticket item storage and settlement helpers shared by the Event and Group
+contracts."""
+
+from enum import Enum
+
+import smartpy as sp
+
+
+class TicketItemState(Enum):
+    CREATED = 0
+    SOLD = 1
+    INACTIVE = 2
+
+
+t_royalty_shares = sp.TRecord(
+    minter=sp.TAddress,
+    minter_share=sp.TNat,
+    creator=sp.TAddress,
+    creator_share=sp.TNat,
+).layout(("minter", ("minter_share", ("creator", "creator_share"))))
+
+# fa2 is None for the tokens of the contract fa2
+t_event_ticket_item = sp.TRecord(
+    id = sp.TNat,
+    fa2 = sp.TOption(sp.TAddress),
+    token_id = sp.TNat,
+    seller = sp.TAddress,
+    buyer = sp.TOption(sp.TAddress),
+    price = sp.TMutez,
+    state = sp.TNat
+)
+
+# group ticket items also store the per-mille royalty shares of the token
+# when it was listed
+t_ticket_item = sp.TRecord(
+    id = sp.TNat,
+    fa2 = sp.TOption(sp.TAddress),
+    token_id = sp.TNat,
+    seller = sp.TAddress,
+    buyer = sp.TOption(sp.TAddress),
+    price = sp.TMutez,
+    state = sp.TNat,
+    royalties = t_royalty_shares
+)
+
+t_transfer_params = sp.TList(sp.TRecord(
+    from_=sp.TAddress,
+    txs=sp.TList(sp.TRecord(
+        to_=sp.TAddress,
+        token_id=sp.TNat,
+        amount=sp.TNat).layout(("to_", ("token_id", "amount"))))))
+
+USER_ROYALTIES_TYPE = sp.TRecord(
+    address=sp.TAddress,
+    royalties=sp.TNat).layout(("address", "royalties"))
+
+# the largest per-mille management fee
+MAX_FEE = 250
+
+
+class TicketMarket:
+    """(Mixin) Balance ledger, item indexes and FA2 helpers of a ticket
+    market.
+
+    `fa2_override` and `ticket_item_fa2` require `fa2` in the storage,
+    `credit` requires a `balances` big map of mutez.
+    """
+
+    def credit(self, recipient, amount):
+        """Credits mutez to the balance the recipient can withdraw.
+        """
+        with sp.if_(amount > sp.mutez(0)):
+            self.data.balances[recipient] = self.data.balances.get(
+                recipient, sp.mutez(0)) + amount
+
+    def add_indexed_item(self, items, indexes, counts, owner, item_id):
+        """Appends an item id to the items of the owner, in constant cost.
+        """
+        key = sp.compute(sp.pair(owner, item_id))
+        with sp.if_(~indexes.contains(key)):
+            count = sp.compute(counts.get(owner, sp.nat(0)))
+            items[sp.pair(owner, count)] = item_id
+            indexes[key] = count
+            counts[owner] = count + 1
+
+    def remove_indexed_item(self, items, indexes, counts, owner, item_id):
+        """Removes an item id from the items of the owner, in constant cost.
+
+        The last item of the owner takes the index of the removed one.
+        """
+        key = sp.compute(sp.pair(owner, item_id))
+        index = sp.compute(indexes.get_opt(key).open_some("item is not indexed"))
+        last_index = sp.compute(sp.as_nat(counts[owner] - 1))
+        with sp.if_(index != last_index):
+            last_item_id = sp.compute(items[sp.pair(owner, last_index)])
+            items[sp.pair(owner, index)] = last_item_id
+            indexes[sp.pair(owner, last_item_id)] = index
+        del items[sp.pair(owner, last_index)]
+        del indexes[key]
+        counts[owner] = last_index
+
+    def indexed_items_page(self, items, counts, owner, offset, limit):
+        """Returns the item ids of the owner with index in [offset, offset + limit).
+        """
+        page = sp.local("page", sp.list([], t=sp.TNat))
+        end = sp.compute(sp.min(offset + limit, counts.get(owner, sp.nat(0))))
+        with sp.for_("index", sp.range(offset, end)) as index:
+            page.value.push(items[sp.pair(owner, index)])
+        return page.value.rev()
+
+    def fa2_override(self, fa2):
+        """Returns the FA2 address to store in a ticket item, None for the
+        contract fa2.
+        """
+        return sp.eif(fa2 == self.data.fa2, sp.none, sp.some(fa2))
+
+    def ticket_item_fa2(self, item):
+        """Returns the FA2 contracts address of a ticket item.
+        """
+        return sp.eif(item.fa2.is_some(), item.fa2.open_some(), self.data.fa2)
+
+    def fa2_transfer(self, fa2, from_, to_, token_id, token_amount):
+        """Transfers a number of editions of a FA2 token between two addresses.
+        """
+        # Get a handle to the FA2 token transfer entry point
+        c = sp.contract(
+            t=t_transfer_params,
+            address=fa2,
+            entry_point="transfer").open_some()
+
+        # Transfer the FA2 token editions to the new address
+        sp.transfer(
+            arg=sp.list([sp.record(
+                from_=from_,
+                txs=sp.list([sp.record(
+                    to_=to_,
+                    token_id=token_id,
+                    amount=token_amount)]))]),
+            amount=sp.mutez(0),
+            destination=c)
+
+    def token_royalty_shares(self, fa2, token_id, max_shares):
+        """Returns the per-mille royalty shares of a token, calling the FA2
+        contracts `token_royalties` on-chain view. A FA2 without the view
+        pays no royalties.
+
+        The shares can't exceed `max_shares`, the part of a sale price left
+        once the other shares are taken.
+        """
+        royalties = sp.local("royalties", sp.record(
+            minter=sp.sender,
+            minter_share=sp.nat(0),
+            creator=sp.sender,
+            creator_share=sp.nat(0)))
+        token_royalties = sp.compute(sp.view(
+            name="token_royalties",
+            address=fa2,
+            param=token_id,
+            t=sp.TRecord(
+                minter=USER_ROYALTIES_TYPE,
+                creator=USER_ROYALTIES_TYPE).layout(
+                        ("minter", "creator"))
+            ))
+        with sp.if_(token_royalties.is_some()):
+            royalties.value = sp.record(
+                minter=token_royalties.open_some().minter.address,
+                minter_share=token_royalties.open_some().minter.royalties,
+                creator=token_royalties.open_some().creator.address,
+                creator_share=token_royalties.open_some().creator.royalties)
+        sp.verify(royalties.value.minter_share + royalties.value.creator_share <= max_shares,
+                  message="MP_WRONG_ROYALTIES")
+        return royalties.value
+
+
+class RoyaltiesTestFA2(sp.Contract):
+    """A test contracts exposing the `token_royalties` on-chain view with the
+    same shares for every token, transfers are accepted and ignored.
+    """
+
+    def __init__(self, minter, creator, share):
+        self.init(minter=minter, creator=creator, share=share)
+
+    @sp.entry_point
+    def transfer(self, batch):
+        sp.set_type(batch, t_transfer_params)
+
+    @sp.onchain_view()
+    def token_royalties(self, token_id):
+        sp.set_type(token_id, sp.TNat)
+        sp.result(sp.set_type_expr(
+            sp.record(
+                minter=sp.record(address=self.data.minter, royalties=self.data.share),
+                creator=sp.record(address=self.data.creator, royalties=self.data.share)),
+            sp.TRecord(
+                minter=USER_ROYALTIES_TYPE,
+                creator=USER_ROYALTIES_TYPE).layout(("minter", "creator"))))